@@ -2,145 +2,332 @@
 Admin dashboard module
 """
 
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from functools import wraps
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for, session
+from flask import Blueprint, current_app, make_response, render_template, request, jsonify, redirect, url_for, session
+from sqlalchemy import event, text, tuple_
+from sqlalchemy.orm import joinedload, load_only
 from models import db, User, Donation, Pokemon, Favorite, Team, QuizScore, PokemonImage
+from extensions import cache
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
 
+@cache.memoize(timeout=300)
+def _is_admin(user_id):
+    """Cached admin-role lookup so admin views skip the per-request SELECT"""
+    user = db.session.get(User, user_id)
+    return bool(user and user.is_admin)
+
+
 def admin_required(f):
     """Decorator to require admin role"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if 'user_id' not in session:
             return redirect(url_for('auth.login', next=request.url))
-        
-        user = User.query.get(session['user_id'])
-        if not user or not user.is_admin:
+
+        if not _is_admin(session['user_id']):
             return redirect(url_for('index'))
         return f(*args, **kwargs)
     return decorated_function
 
 
-@admin_bp.route('/')
-@admin_required
-def dashboard():
-    """Admin dashboard home"""
-    from datetime import datetime, timedelta
+# All scalar dashboard metrics fetched as one statement: each aggregate is a
+# scalar subquery, so the whole block costs a single round-trip instead of ~15.
+DASHBOARD_STATS_SQL = text("""
+    SELECT
+        (SELECT count(*) FROM users) AS total_users,
+        (SELECT count(*) FROM donations WHERE status = 'succeeded') AS total_donations,
+        (SELECT coalesce(sum(amount), 0) / 100.0 FROM donations WHERE status = 'succeeded') AS total_revenue,
+        (SELECT count(*) FROM pokemon) AS total_pokemon,
+        (SELECT count(*) FROM pokemon_images) AS total_images,
+        (SELECT count(*) FROM favorites) AS total_favorites,
+        (SELECT count(*) FROM teams) AS total_teams,
+        (SELECT count(*) FROM quiz_scores) AS total_quiz_plays,
+        (SELECT count(*) FROM users WHERE created_at >= :week_ago) AS new_users_week,
+        (SELECT count(*) FROM users WHERE last_login >= :week_ago) AS active_users_week,
+        (SELECT coalesce(sum(amount), 0) / 100.0 FROM donations
+            WHERE status = 'succeeded' AND created_at >= :month_ago) AS monthly_revenue,
+        (SELECT coalesce(avg(amount), 0) / 100.0 FROM donations WHERE status = 'succeeded') AS avg_donation,
+        (SELECT coalesce(avg(percent_score), 0) FROM quiz_scores) AS avg_quiz_score,
+        (SELECT count(*) FROM users WHERE role = 'admin') AS admin_count
+""")
+
+
+@cache.cached(timeout=60, key_prefix='admin_dashboard_stats')
+def _compute_dashboard_stats():
+    """All scalar stats (counts, sums, averages) in a single round-trip"""
+    week_ago = datetime.now(timezone.utc) - timedelta(days=7)
+    month_ago = datetime.now(timezone.utc) - timedelta(days=30)
+    row = db.session.execute(
+        DASHBOARD_STATS_SQL, {'week_ago': week_ago, 'month_ago': month_ago}
+    ).one()
+    return dict(row._mapping)
+
+
+@event.listens_for(User, 'after_insert')
+@event.listens_for(Donation, 'after_insert')
+@event.listens_for(Donation, 'after_update')
+def _invalidate_dashboard_stats(mapper, connection, target):
+    """Drop cached stats when the data they summarize changes"""
+    try:
+        cache.delete('admin_dashboard_stats')
+    except Exception:
+        pass  # Cache not initialized (e.g. during migrations)
+
+
+TypeCount = namedtuple('TypeCount', ['main_type', 'count'])
+
+
+@cache.cached(timeout=3600, key_prefix='admin_type_distribution')
+def _compute_type_distribution():
+    """Per-type Pokemon counts; Pokemon data is nearly static, so this acts
+    as a materialized snapshot refreshed only when the table changes."""
     from sqlalchemy import func
-    
-    # Basic stats
-    total_users = User.query.count()
-    total_donations = Donation.query.filter_by(status='succeeded').count()
-    total_revenue = db.session.query(db.func.sum(Donation.amount)).filter_by(status='succeeded').scalar() or 0
-    total_pokemon = Pokemon.query.count()
-    total_images = PokemonImage.query.count()
-    
-    # User engagement stats
-    total_favorites = Favorite.query.count()
-    total_teams = Team.query.count()
-    total_quiz_plays = QuizScore.query.count()
-    
-    # Users in last 7 days
-    week_ago = datetime.utcnow() - timedelta(days=7)
-    new_users_week = User.query.filter(User.created_at >= week_ago).count()
-    active_users_week = User.query.filter(User.last_login >= week_ago).count()
-    
-    # Donations in last 30 days
-    month_ago = datetime.utcnow() - timedelta(days=30)
-    monthly_revenue = db.session.query(db.func.sum(Donation.amount)).filter(
-        Donation.status == 'succeeded',
-        Donation.created_at >= month_ago
-    ).scalar() or 0
-    
-    # Average donation amount
-    avg_donation = db.session.query(db.func.avg(Donation.amount)).filter_by(status='succeeded').scalar() or 0
-    
-    # Top favorited Pokemon
-    top_favorited = db.session.query(
-        Pokemon.name,
-        Pokemon.number,
-        func.count(Favorite.id).label('fav_count')
-    ).join(Favorite).group_by(Pokemon.id).order_by(func.count(Favorite.id).desc()).limit(5).all()
-    
-    # Type distribution
-    type_distribution = db.session.query(
+
+    rows = db.session.query(
         Pokemon.main_type,
         func.count(Pokemon.id).label('count')
     ).group_by(Pokemon.main_type).order_by(func.count(Pokemon.id).desc()).all()
-    
-    # Quiz stats
-    avg_quiz_score = db.session.query(
-        func.avg(QuizScore.score * 100.0 / QuizScore.total_questions)
-    ).scalar() or 0
-    
-    # Recent donations
-    recent_donations = Donation.query.filter_by(status='succeeded').order_by(Donation.created_at.desc()).limit(10).all()
-    
-    # Recent users
-    recent_users = User.query.order_by(User.created_at.desc()).limit(10).all()
-    
-    # Admin users count
-    admin_count = User.query.filter_by(role='admin').count()
-    
+    return [TypeCount(r.main_type, r.count) for r in rows]
+
+
+@event.listens_for(Pokemon, 'after_insert')
+@event.listens_for(Pokemon, 'after_update')
+@event.listens_for(Pokemon, 'after_delete')
+def _invalidate_type_distribution(mapper, connection, target):
+    """Refresh the type-distribution snapshot on Pokemon writes"""
+    try:
+        cache.delete('admin_type_distribution')
+    except Exception:
+        pass  # Cache not initialized (e.g. during migrations)
+
+
+def _query_top_favorited():
+    """Top favorited Pokemon: aggregate the narrow favorites table first, then
+    join only the winning 5 rows to pokemon (late row lookup)"""
+    from sqlalchemy import func
+
+    fav_counts = db.session.query(
+        Favorite.pokemon_id,
+        func.count(Favorite.id).label('fav_count')
+    ).group_by(Favorite.pokemon_id).order_by(func.count(Favorite.id).desc()).limit(5).subquery()
+    return db.session.query(
+        Pokemon.name,
+        Pokemon.number,
+        fav_counts.c.fav_count
+    ).join(fav_counts, Pokemon.id == fav_counts.c.pokemon_id).order_by(fav_counts.c.fav_count.desc()).all()
+
+
+def _query_recent_donations():
+    """Latest succeeded donations, user joined in to avoid per-row lookups.
+    Only the columns the dashboard renders are fetched; the Stripe ids and
+    timestamps stay on disk."""
+    return Donation.query.options(
+        load_only(Donation.amount, Donation.currency, Donation.status,
+                  Donation.donor_name, Donation.donor_email, Donation.message,
+                  Donation.created_at),
+        joinedload(Donation.user).load_only(User.name, User.email),
+    ).filter_by(status='succeeded').order_by(Donation.created_at.desc()).limit(10).all()
+
+
+def _query_recent_users():
+    """Latest signups (only the columns the dashboard renders)"""
+    return User.query.options(
+        load_only(User.email, User.name, User.avatar_url, User.role, User.created_at)
+    ).order_by(User.created_at.desc()).limit(10).all()
+
+
+def _run_parallel(jobs):
+    """Run independent query callables concurrently, each on its own pooled
+    connection inside its own app context, so wall-clock time is the slowest
+    query rather than the sum of all of them."""
+    app = current_app._get_current_object()
+
+    def call(fn):
+        with app.app_context():
+            return fn()
+
+    with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+        futures = [executor.submit(call, fn) for fn in jobs]
+        return [f.result() for f in futures]
+
+
+@admin_bp.route('/')
+@admin_required
+def dashboard():
+    """Admin dashboard home"""
+    stats = _compute_dashboard_stats()
+
+    # The grouped queries are independent of each other, so overlap their
+    # round-trips; the recent-activity lists load after first paint via
+    # /admin/dashboard/recent
+    top_favorited, type_distribution = _run_parallel([
+        _query_top_favorited,
+        _compute_type_distribution,
+    ])
+
     return render_template('admin/dashboard.html',
-        total_users=total_users,
-        total_donations=total_donations,
-        total_revenue=total_revenue / 100,
-        total_pokemon=total_pokemon,
-        total_images=total_images,
-        total_favorites=total_favorites,
-        total_teams=total_teams,
-        total_quiz_plays=total_quiz_plays,
-        new_users_week=new_users_week,
-        active_users_week=active_users_week,
-        monthly_revenue=monthly_revenue / 100,
-        avg_donation=avg_donation / 100,
+        total_users=stats['total_users'],
+        total_donations=stats['total_donations'],
+        total_revenue=stats['total_revenue'],
+        total_pokemon=stats['total_pokemon'],
+        total_images=stats['total_images'],
+        total_favorites=stats['total_favorites'],
+        total_teams=stats['total_teams'],
+        total_quiz_plays=stats['total_quiz_plays'],
+        new_users_week=stats['new_users_week'],
+        active_users_week=stats['active_users_week'],
+        monthly_revenue=stats['monthly_revenue'],
+        avg_donation=stats['avg_donation'],
         top_favorited=top_favorited,
         type_distribution=type_distribution,
-        avg_quiz_score=avg_quiz_score,
-        recent_donations=recent_donations,
-        recent_users=recent_users,
-        admin_count=admin_count
+        avg_quiz_score=stats['avg_quiz_score'],
+        admin_count=stats['admin_count']
     )
 
 
+@admin_bp.route('/dashboard/recent')
+@admin_required
+def dashboard_recent():
+    """Recent-activity lists, fetched by the dashboard after first paint so
+    they stay off the critical path of the initial render"""
+    recent_donations, recent_users = _run_parallel([
+        _query_recent_donations,
+        _query_recent_users,
+    ])
+    response = jsonify({
+        'recent_donations': [d.to_dict() for d in recent_donations],
+        'recent_users': [u.to_dict() for u in recent_users],
+    })
+    # Repeated refreshes within 30s can reuse the browser's copy
+    response.headers['Cache-Control'] = 'private, max-age=30'
+    return response
+
+
+PER_PAGE = 20
+
+
+def _parse_cursor(raw):
+    """Parse an `after` keyset cursor of the form '<created_at isoformat>,<id>'"""
+    if not raw:
+        return None
+    try:
+        ts_part, id_part = raw.rsplit(',', 1)
+        return datetime.fromisoformat(ts_part), int(id_part)
+    except (ValueError, TypeError):
+        return None
+
+
+def _next_cursor(rows):
+    """Build the cursor pointing past the last row of a page"""
+    last = rows[-1]
+    return f"{last.created_at.isoformat()},{last.id}"
+
+
+def _table_etag(fingerprint_sql):
+    """Cheap data fingerprint for conditional GETs on the admin list pages.
+    Returns (etag, not_modified_response_or_None)."""
+    import hashlib
+
+    basis = db.session.execute(text(fingerprint_sql)).first()
+    etag = hashlib.md5(repr(tuple(basis)).encode()).hexdigest()
+    if request.if_none_match.contains(etag):
+        return etag, ('', 304)
+    return etag, None
+
+
+def _conditional(body, etag):
+    """Attach the ETag so the next identical request can get a 304"""
+    response = make_response(body)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, max-age=0'
+    return response
+
+
 @admin_bp.route('/users')
 @admin_required
 def users():
-    """User management page"""
-    page = request.args.get('page', 1, type=int)
-    users = User.query.order_by(User.created_at.desc()).paginate(page=page, per_page=20)
-    return render_template('admin/users.html', users=users)
+    """User management page (keyset-paginated on created_at, id)"""
+    etag, not_modified = _table_etag(
+        "SELECT count(*), max(created_at), max(last_login),"
+        " sum(CASE WHEN role = 'admin' THEN 1 ELSE 0 END) FROM users"
+    )
+    if not_modified:
+        return not_modified
+
+    after = _parse_cursor(request.args.get('after'))
+
+    query = User.query.order_by(User.created_at.desc(), User.id.desc())
+    if after:
+        query = query.filter(tuple_(User.created_at, User.id) < after)
+
+    rows = query.limit(PER_PAGE + 1).all()
+    users = rows[:PER_PAGE]
+    next_cursor = _next_cursor(users) if len(rows) > PER_PAGE else None
+    body = render_template('admin/users.html', users=users, next_cursor=next_cursor)
+    return _conditional(body, etag)
 
 
 @admin_bp.route('/users/<int:user_id>/toggle-admin', methods=['POST'])
 @admin_required
 def toggle_admin(user_id):
     """Toggle admin status for a user"""
-    user = User.query.get_or_404(user_id)
-    
     # Prevent removing own admin status
-    if user.id == session['user_id']:
+    if user_id == session['user_id']:
         return jsonify({'error': 'Cannot modify your own admin status'}), 400
-    
-    user.role = 'user' if user.role == 'admin' else 'admin'
+
+    # Single UPDATE ... RETURNING instead of SELECT + UPDATE: one round-trip,
+    # and no race between reading the role and flipping it
+    row = db.session.execute(text("""
+        UPDATE users
+        SET role = CASE WHEN role = 'admin' THEN 'user' ELSE 'admin' END
+        WHERE id = :id
+        RETURNING role
+    """), {'id': user_id}).first()
+
+    if row is None:
+        db.session.rollback()
+        return jsonify({'error': 'User not found'}), 404
+
     db.session.commit()
-    
-    return jsonify({'success': True, 'new_role': user.role})
+
+    # The cached role check must reflect the change immediately
+    cache.delete_memoized(_is_admin, user_id)
+
+    return jsonify({'success': True, 'new_role': row.role})
 
 
 @admin_bp.route('/donations')
 @admin_required
 def donations():
-    """Donations management page"""
-    page = request.args.get('page', 1, type=int)
+    """Donations management page (keyset-paginated on created_at, id)"""
+    # The pending count makes every status flip visible to the fingerprint:
+    # all transitions (succeeded, expired, failed) move a row out of
+    # 'pending', and expiry writes no timestamp the other terms would see
+    etag, not_modified = _table_etag(
+        "SELECT count(*), max(created_at), max(completed_at),"
+        " sum(CASE WHEN status = 'succeeded' THEN 1 ELSE 0 END),"
+        " sum(CASE WHEN status = 'pending' THEN 1 ELSE 0 END) FROM donations"
+    )
+    if not_modified:
+        return not_modified
+
+    after = _parse_cursor(request.args.get('after'))
     status = request.args.get('status', '')
-    
-    query = Donation.query
+
+    query = Donation.query.options(joinedload(Donation.user))
     if status:
         query = query.filter_by(status=status)
-    
-    donations = query.order_by(Donation.created_at.desc()).paginate(page=page, per_page=20)
-    return render_template('admin/donations.html', donations=donations, status_filter=status)
+    if after:
+        query = query.filter(tuple_(Donation.created_at, Donation.id) < after)
+
+    rows = query.order_by(Donation.created_at.desc(), Donation.id.desc()).limit(PER_PAGE + 1).all()
+    donations = rows[:PER_PAGE]
+    next_cursor = _next_cursor(donations) if len(rows) > PER_PAGE else None
+    body = render_template('admin/donations.html', donations=donations,
+                           next_cursor=next_cursor, status_filter=status)
+    return _conditional(body, etag)
@@ -5,12 +5,19 @@ Flask Application with SQLite Database
 
 import os
 import json
+import queue
+import random
+import threading
+import time
 import numpy as np
 import cv2
 from dotenv import load_dotenv
-from flask import Flask, render_template, request, jsonify, redirect, url_for, send_from_directory, session
+from flask import Flask, Response, abort, g, render_template, request, jsonify, redirect, url_for, send_from_directory, session
 from flask_cors import CORS
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import joinedload, lazyload, selectinload
 from models import db, Pokemon, PokemonImage, PokemonType, User, Donation, Favorite, Team, TeamMember, QuizScore
+from extensions import cache, limiter
 
 load_dotenv()
 load_dotenv('.env.example', override=False)
@@ -18,12 +25,48 @@ load_dotenv('.env.example', override=False)
 app = Flask(__name__)
 CORS(app)
 
+# Serialize JSON responses with orjson when available: every jsonify() call
+# (search results, gallery, team analysis — lists of to_dict() dicts) goes
+# through the provider, and orjson handles datetime natively.
+try:
+    import orjson
+
+    from flask.json.provider import JSONProvider
+
+    class OrjsonProvider(JSONProvider):
+        """JSON provider backed by orjson's C encoder"""
+
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj).decode()
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+    app.json = OrjsonProvider(app)
+except ImportError:
+    pass  # stdlib json remains the default
+
 # Configuration
 DATABASE_URL = os.environ.get('DATABASE_URL')
 if DATABASE_URL:
     if DATABASE_URL.startswith('postgres://'):
         DATABASE_URL = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
     app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
+    # Sized for gthread workers (4 threads each) plus the dashboard's
+    # parallel query workers; pre-ping drops stale connections after DB
+    # restarts instead of surfacing them as request errors
+    if DATABASE_URL.startswith('postgresql://'):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            'pool_size': 10,
+            'max_overflow': 20,
+            'pool_pre_ping': True,
+            'pool_recycle': 1800,
+            # Rewrite executemany batches as multi-VALUES statements so a
+            # batched write is one round trip instead of one per row
+            'executemany_mode': 'values_plus_batch',
+            'executemany_values_page_size': 1000,
+            'executemany_batch_page_size': 500,
+        }
 else:
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///pokemon.db'
 
@@ -31,6 +74,9 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'pokemon-knower-dev-secret-key')
 
 MODEL_PATH = 'pokemon_classifier_model_V3.h5'
+# Optional int8-quantized TFLite build of the same model (see convert_tflite.py);
+# picked up automatically when present for much cheaper CPU inference
+TFLITE_MODEL_PATH = os.environ.get('TFLITE_MODEL_PATH', 'pokemon_classifier_model_V3.int8.tflite')
 CLASS_INDICES_PATH = 'class_indices.json'
 UPLOAD_FOLDER = 'static/uploads'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
@@ -49,8 +95,35 @@ POKEMON_DATA_DIR = resolve_pokemon_data_dir()
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
+# Caching: Redis in production, in-process SimpleCache for local dev
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    app.config['CACHE_TYPE'] = 'RedisCache'
+    app.config['CACHE_REDIS_URL'] = REDIS_URL
+
+    # Server-side sessions in the same Redis: the cookie carries only the
+    # session id instead of the signed payload (no per-request re-signing of
+    # the Stytch token), and logout deletes the server copy immediately
+    from datetime import timedelta
+
+    import redis as redis_lib
+    from flask_session import Session
+
+    app.config.update(
+        SESSION_TYPE='redis',
+        SESSION_REDIS=redis_lib.Redis.from_url(REDIS_URL),
+        SESSION_PERMANENT=True,
+        PERMANENT_SESSION_LIFETIME=timedelta(days=7),
+        SESSION_USE_SIGNER=True,
+    )
+    Session(app)
+else:
+    app.config['CACHE_TYPE'] = 'SimpleCache'
+
 # Initialize database
 db.init_app(app)
+cache.init_app(app)
+limiter.init_app(app)
 
 # Register blueprints
 from auth import auth_bp, get_current_user
@@ -70,14 +143,113 @@ def inject_user():
 target_size = (224, 224)
 model = None
 class_labels = {}
+class_label_list = []  # class_labels values in index order, for the fallback path
 tf_loaded = None
 
+class TFLiteModel:
+    """Drop-in predict() wrapper around a TFLite interpreter.
+
+    Tensors are allocated once at load; int8-quantized graphs get their
+    inputs/outputs rescaled with the quantization parameters baked into the
+    model, so callers keep passing float32 [0, 1] images as before.
+    """
+
+    def __init__(self, interpreter):
+        self._interpreter = interpreter
+        interpreter.allocate_tensors()
+        self._input = interpreter.get_input_details()[0]
+        self._output = interpreter.get_output_details()[0]
+        self._in_scale, self._in_zero = self._input.get('quantization', (0.0, 0))
+        self._out_scale, self._out_zero = self._output.get('quantization', (0.0, 0))
+        shape = self._input['shape']
+        self.input_shape = (None, int(shape[1]), int(shape[2]), int(shape[3]))
+
+    def predict(self, batch, verbose=0):
+        """Mirror Keras model.predict for a stacked float32 batch"""
+        num_classes = int(self._output['shape'][-1])
+        out = np.empty((len(batch), num_classes), dtype=np.float32)
+        for i, img in enumerate(batch):
+            data = img[np.newaxis]
+            if self._input['dtype'] != np.float32 and self._in_scale:
+                data = np.round(data / self._in_scale + self._in_zero).astype(self._input['dtype'])
+            self._interpreter.set_tensor(self._input['index'], data)
+            self._interpreter.invoke()
+            row = self._interpreter.get_tensor(self._output['index'])[0]
+            if row.dtype != np.float32 and self._out_scale:
+                row = (row.astype(np.float32) - self._out_zero) * self._out_scale
+            out[i] = row
+        return out
+
+
+class GraphModel:
+    """Drop-in predict() wrapper around a traced Keras inference graph.
+
+    Calling the traced tf.function skips model.predict's per-call Python
+    dispatch, and XLA fuses the conv/bias/activation kernels where the
+    host supports it. The [None, H, W, 3] input signature makes a single
+    trace (and a single XLA compile) cover every batch size the /predict
+    micro-batcher produces, instead of retracing per shape on the
+    request path; if XLA fails on any call, inference permanently falls
+    back to a plain trace over the same signature.
+    """
+
+    def __init__(self, keras_model, tf_module):
+        self._model = keras_model
+        self._tf = tf_module
+        self.input_shape = keras_model.input_shape
+        self._signature = [tf_module.TensorSpec(
+            [None, *keras_model.input_shape[1:]], tf_module.float32)]
+        self._infer = tf_module.function(
+            lambda x: keras_model(x, training=False),
+            input_signature=self._signature, jit_compile=True)
+        self._xla_failed = False
+
+    def predict(self, batch, verbose=0):
+        """Mirror Keras model.predict for a stacked float32 batch"""
+        data = np.asarray(batch, dtype=np.float32)
+        if not self._xla_failed:
+            try:
+                return self._infer(data).numpy()
+            except Exception:
+                self._xla_failed = True
+                self._infer = self._tf.function(
+                    lambda x: self._model(x, training=False),
+                    input_signature=self._signature)
+        return self._infer(data).numpy()
+
+
+def _load_tflite_interpreter():
+    """Build a TFLite interpreter, preferring the lightweight tflite_runtime
+    package over the full TF stack"""
+    num_threads = os.cpu_count() or 1
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        from tensorflow.lite import Interpreter
+    return Interpreter(model_path=TFLITE_MODEL_PATH, num_threads=num_threads)
+
+
 def ensure_tf_loaded():
-    """Lazy load TensorFlow on first use"""
+    """Lazy load the classifier on first use.
+
+    Prefers the int8 TFLite build when present (no Keras, far cheaper CPU
+    kernels); falls back to the original .h5 Keras model otherwise.
+    """
     global model, tf_loaded, target_size
     if tf_loaded is not None:
         return tf_loaded
-    
+
+    if os.path.exists(TFLITE_MODEL_PATH):
+        try:
+            print("Loading TFLite model...")
+            model = TFLiteModel(_load_tflite_interpreter())
+            target_size = (model.input_shape[1], model.input_shape[2])
+            print(f"TFLite model loaded successfully. Input size: {target_size}")
+            tf_loaded = True
+            return True
+        except Exception as e:
+            print(f"TFLite model load failed: {e}")
+
     try:
         import tensorflow
         from tensorflow.keras.models import load_model as keras_load
@@ -87,12 +259,12 @@ def ensure_tf_loaded():
             try:
                 import tensorflow as tf
                 with tf.keras.utils.custom_object_scope({}):
-                    model = keras_load(MODEL_PATH, compile=False)
+                    model = GraphModel(keras_load(MODEL_PATH, compile=False), tf)
             except Exception as e1:
                 print(f"Model load failed: {e1}")
                 tf_loaded = False
                 return False
-            
+
             input_shape = model.input_shape
             if input_shape and len(input_shape) == 4:
                 target_size = (input_shape[1], input_shape[2])
@@ -106,54 +278,250 @@ def ensure_tf_loaded():
 
 def load_class_labels():
     """Load class indices"""
-    global class_labels
+    global class_labels, class_label_list
     if class_labels:
         return
-    
+
     if os.path.exists(CLASS_INDICES_PATH):
         with open(CLASS_INDICES_PATH, 'r') as f:
             indices = json.load(f)
             class_labels = {v: k for k, v in indices.items()}
+        class_label_list = [class_labels[i] for i in sorted(class_labels)]
         print(f"Loaded {len(class_labels)} class labels")
 
 # Load class labels on startup
 load_class_labels()
 
+def _warmup():
+    """Load the model and run two dummy inferences (one traces the graph,
+    one stabilizes autotuned kernels) so the first real /predict request
+    sees a warm graph instead of paying the multi-second load"""
+    if ensure_tf_loaded() and model is not None:
+        dummy = np.zeros((1, target_size[0], target_size[1], 3), dtype=np.float32)
+        model.predict(dummy, verbose=0)
+        model.predict(dummy, verbose=0)
+        print("Model warmed up")
+
+
+# Optionally warm the model at worker startup (set FLASK_WARMUP=1, e.g. in a
+# gunicorn post_worker_init hook or the container environment); lazy loading
+# stays the default because non-inference entry points never need TF.
+if os.environ.get('FLASK_WARMUP', '').lower() in ('1', 'true', 'yes'):
+    _warmup()
+
+# Prebuilt dotted-suffix set so allowed_file is one C-level splitext + hash
+# lookup per upload
+_EXT_SET = frozenset('.' + ext for ext in ALLOWED_EXTENSIONS)
+
 def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return os.path.splitext(filename)[1].lower() in _EXT_SET
 
-def preprocess_image(image_path):
-    """Preprocess image for model prediction"""
+# 256-entry uint8 -> float32 lookup table: the per-pixel rescale becomes one
+# gather instead of a cast plus divide
+_RESCALE_LUT = np.arange(256, dtype=np.float32) * np.float32(1.0 / 255.0)
+
+
+def _prepare_image(img):
+    """Convert a decoded BGR image to a float32 (1, H, W, 3) model input.
+
+    Pure OpenCV/NumPy: resize while still BGR, then a single LUT gather over
+    the reversed-stride view does the channel swap, the float32 cast and the
+    1/255 rescale in one pass — no cvtColor pass, no Keras import and no
+    float64 intermediate on the hot path.
+    """
     global target_size
+    img = cv2.resize(img, target_size, interpolation=cv2.INTER_AREA)
+    return _RESCALE_LUT[img[None, ..., ::-1]]
+
+
+def preprocess_image(image_path):
+    """Preprocess an image file for model prediction"""
     try:
-        from tensorflow.keras.preprocessing.image import img_to_array
-        img = cv2.imread(image_path)
+        img = cv2.imread(image_path, cv2.IMREAD_COLOR)
         if img is None:
             return None
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        img = cv2.resize(img, target_size)
-        img = img.astype("float") / 255.0
-        img = img_to_array(img)
-        img = np.expand_dims(img, axis=0)
-        return img
+        return _prepare_image(img)
     except Exception as e:
         print(f"Image preprocessing error: {e}")
         return None
 
+
+def preprocess_image_bytes(data):
+    """Preprocess an in-memory upload for model prediction (no disk I/O)"""
+    try:
+        img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            return None
+        return _prepare_image(img)
+    except Exception as e:
+        print(f"Image preprocessing error: {e}")
+        return None
+
+# Micro-batching for /predict: concurrent uploads are collected for up to
+# PREDICT_BATCH_TIMEOUT seconds (or PREDICT_MAX_BATCH images) and run through
+# the model as one stacked tensor, amortizing the per-call TF dispatch cost.
+PREDICT_MAX_BATCH = 16
+PREDICT_BATCH_TIMEOUT = 0.01  # seconds
+
+_predict_queue = queue.Queue()
+_predict_worker_lock = threading.Lock()
+_predict_worker_started = False
+
+
+def _predict_worker_loop():
+    """Daemon worker: drain the queue into batches and demux results"""
+    while True:
+        items = [_predict_queue.get()]
+        deadline = time.monotonic() + PREDICT_BATCH_TIMEOUT
+        while len(items) < PREDICT_MAX_BATCH:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(_predict_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        try:
+            batch = np.stack([img for img, _, _ in items])
+            predictions = model.predict(batch, verbose=0)
+            for row, (_, event, out) in zip(predictions, items):
+                out['probabilities'] = row
+                event.set()
+        except Exception as e:
+            for _, event, out in items:
+                out['error'] = e
+                event.set()
+
+
+def _start_predict_worker():
+    """Start the batching worker once, on first successful model load"""
+    global _predict_worker_started
+    with _predict_worker_lock:
+        if not _predict_worker_started:
+            threading.Thread(target=_predict_worker_loop, daemon=True).start()
+            _predict_worker_started = True
+
+
+def predict_probabilities(img):
+    """Run one preprocessed (1, H, W, 3) image through the shared batcher
+    and return its class-probability row."""
+    _start_predict_worker()
+    event = threading.Event()
+    out = {}
+    _predict_queue.put((img[0], event, out))
+    if not event.wait(timeout=30):
+        raise RuntimeError('Prediction timed out')
+    if 'error' in out:
+        raise out['error']
+    return out['probabilities']
+
+
+# The id (not the ORM object) is memoized so cache hits re-fetch through
+# db.session.get, which serves from the session identity map and never hands
+# out detached instances.
+# Lookup statements built once at import: cache misses execute the same
+# compiled SELECT with fresh bind parameters instead of re-running the SQL
+# compiler per call. Callers pass the name already lowercased, so the exact
+# comparison on lower(name) rides the ix_pokemon_name_lower functional index.
+from sqlalchemy import bindparam, select as sa_select
+
+_POKEMON_ID_BY_NAME_STMT = sa_select(Pokemon.id).where(
+    db.func.lower(Pokemon.name) == bindparam('name')).limit(1)
+_POKEMON_ID_BY_NUMBER_STMT = sa_select(Pokemon.id).where(
+    Pokemon.number == bindparam('number')).limit(1)
+
+
+@cache.memoize(timeout=60)
+def _pokemon_id_by_name(name):
+    return db.session.execute(_POKEMON_ID_BY_NAME_STMT, {'name': name}).scalar()
+
+
+@cache.memoize(timeout=60)
+def _pokemon_id_by_number(number):
+    return db.session.execute(_POKEMON_ID_BY_NUMBER_STMT, {'number': number}).scalar()
+
+
+@cache.memoize(timeout=3600)
+def _pokemon_view(pokemon_id):
+    """Serialized payload for one Pokémon; reference data in practice, so a
+    long TTL plus the write-event invalidation below keeps it honest"""
+    pokemon = db.session.get(Pokemon, pokemon_id)
+    return pokemon.to_dict() if pokemon else None
+
+
 def get_pokemon_by_name(name):
     """Get Pokémon from database by name (case-insensitive)"""
-    return Pokemon.query.filter(Pokemon.name.ilike(name)).first()
+    pokemon_id = _pokemon_id_by_name((name or '').strip().lower())
+    return db.session.get(Pokemon, pokemon_id) if pokemon_id else None
 
 def get_pokemon_by_number(number):
     """Get Pokémon from database by number"""
-    return Pokemon.query.filter_by(number=number).first()
+    pokemon_id = _pokemon_id_by_number(number)
+    return db.session.get(Pokemon, pokemon_id) if pokemon_id else None
+
+
+def _pokemon_id_bounds():
+    """Cached (min id, max id) of the pokemon table, for random sampling"""
+    bounds = cache.get('pokemon_id_bounds')
+    if bounds is None:
+        from sqlalchemy import func
+        bounds = tuple(db.session.query(func.min(Pokemon.id), func.max(Pokemon.id)).first())
+        cache.set('pokemon_id_bounds', bounds, timeout=300)
+    return bounds
+
+
+def sample_random_pokemon(count=1):
+    """Sample distinct random Pokémon by id range.
+
+    Picking a random id and seeking to the next existing row is one indexed
+    lookup per pick, unlike ORDER BY random() which sorts the whole table.
+    """
+    lo, hi = _pokemon_id_bounds()
+    if lo is None:
+        return []
+
+    picked = {}
+    attempts = 0
+    while len(picked) < count and attempts < count * 8:
+        attempts += 1
+        rid = random.randint(lo, hi)
+        pokemon = Pokemon.query.filter(Pokemon.id >= rid).order_by(Pokemon.id).first()
+        if pokemon and pokemon.id not in picked:
+            picked[pokemon.id] = pokemon
+    return list(picked.values())
 
 # ==================== ROUTES ====================
 
+# When running behind nginx, let it stream Pokémon images instead of Flask
+USE_X_ACCEL_REDIRECT = os.environ.get('USE_X_ACCEL_REDIRECT', '').lower() in ('1', 'true', 'yes')
+
+
+# Pokémon artwork never changes for a given path, so browsers can cache hard
+POKEDATA_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
 @app.route('/pokedata/<path:filename>')
 def pokedata_file(filename):
     """Serve Pokémon images stored outside /static (e.g., PokemonData/<PokemonName>/...)"""
-    return send_from_directory(POKEMON_DATA_DIR, filename)
+    if USE_X_ACCEL_REDIRECT:
+        # Answer with headers only and hand the byte transfer to nginx's
+        # internal /_pokedata/ location (see nginx.conf), freeing this worker
+        import mimetypes
+        from urllib.parse import quote
+        from werkzeug.security import safe_join
+
+        if safe_join(POKEMON_DATA_DIR, filename) is None:
+            abort(404)
+        response = Response(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = '/_pokedata/' + quote(filename)
+        response.headers['Cache-Control'] = POKEDATA_CACHE_CONTROL
+        return response
+    # send_from_directory handles If-Modified-Since/ETag conditional GETs;
+    # the long max-age keeps repeat pokedex loads off the wire entirely
+    response = send_from_directory(POKEMON_DATA_DIR, filename, conditional=True)
+    response.headers['Cache-Control'] = POKEDATA_CACHE_CONTROL
+    return response
 
 
 def image_url(path: str) -> str:
@@ -192,19 +560,105 @@ def admin_dashboard():
     """Redirect to admin blueprint"""
     return redirect(url_for('admin.dashboard'))
 
+# The Pokédex data is nearly static, so the listing pages render from one
+# cached serialized snapshot instead of querying per request; SQLAlchemy
+# events below drop it whenever the underlying tables change.
+@cache.cached(timeout=3600, key_prefix='pokemon_snapshot')
+def _pokemon_snapshot():
+    """All Pokémon (with images) serialized to dicts, ordered by number"""
+    return [
+        p.to_dict()
+        for p in Pokemon.query.options(selectinload(Pokemon.images)).order_by(Pokemon.number).all()
+    ]
+
+
+def _invalidate_pokemon_snapshot(mapper, connection, target):
+    """Drop the serialized snapshot (and the stats built over the same
+    tables) on Pokémon/image writes"""
+    try:
+        cache.delete('pokemon_snapshot')
+        cache.delete('api_stats')
+        cache.delete_memoized(_pokemon_view)
+    except Exception:
+        pass  # Cache not initialized (e.g. during migrations)
+
+
+for _model in (Pokemon, PokemonImage):
+    for _event_name in ('after_insert', 'after_update', 'after_delete'):
+        sa_event.listen(_model, _event_name, _invalidate_pokemon_snapshot)
+
+
+GEN_RANGES = {
+    '1': (1, 151), '2': (152, 251), '3': (252, 386),
+    '4': (387, 493), '5': (494, 649), '6': (650, 721),
+    '7': (722, 809), '8': (810, 905), '9': (906, 1025)
+}
+
+
+class SimplePagination:
+    """Minimal Pagination stand-in over an in-memory list, exposing the
+    attributes the templates use (items, page, pages, has_prev/has_next,
+    prev_num/next_num, iter_pages)."""
+
+    def __init__(self, all_items, page, per_page):
+        self.total = len(all_items)
+        self.per_page = per_page
+        self.pages = max(1, -(-self.total // per_page))
+        self.page = min(max(page, 1), self.pages)
+        start = (self.page - 1) * per_page
+        self.items = all_items[start:start + per_page]
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    @property
+    def has_next(self):
+        return self.page < self.pages
+
+    @property
+    def prev_num(self):
+        return self.page - 1 if self.has_prev else None
+
+    @property
+    def next_num(self):
+        return self.page + 1 if self.has_next else None
+
+    def iter_pages(self, left_edge=2, left_current=2, right_current=5, right_edge=2):
+        last = 0
+        for num in range(1, self.pages + 1):
+            if (num <= left_edge
+                    or (self.page - left_current <= num <= self.page + right_current)
+                    or num > self.pages - right_edge):
+                if last + 1 != num:
+                    yield None
+                yield num
+                last = num
+
+
 @app.route('/pokedex')
 def pokedex():
     """Full Pokédex listing page"""
+    import bisect
+
     page = request.args.get('page', 1, type=int)
+    after = request.args.get('after', type=int)
     per_page = 24
-    
-    pokemon_list = Pokemon.query.order_by(Pokemon.number).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
-    
-    return render_template('pokedex.html', 
-                         pokemon_list=pokemon_list.items,
-                         pagination=pokemon_list,
+
+    # Page straight out of the cached snapshot: an O(1) slice instead of a
+    # paginated SELECT per hit. ?after=<number> is a keyset cursor ("next 24
+    # past this Pokédex number"); ?page= remains for the numbered controls.
+    snapshot = _pokemon_snapshot()
+    if after is not None:
+        start = bisect.bisect_right(snapshot, after, key=lambda p: p['number'])
+        page = start // per_page + 1
+    pagination = SimplePagination(snapshot, page, per_page)
+    next_after = pagination.items[-1]['number'] if pagination.has_next and pagination.items else None
+
+    return render_template('pokedex.html',
+                         pokemon_list=pagination.items,
+                         pagination=pagination,
+                         next_after=next_after,
                          types=PokemonType.get_type_data())
 
 @app.route('/pokemon/')
@@ -228,13 +682,20 @@ def pokemon_detail(identifier):
     if not pokemon:
         return render_template('404.html', message=f"Pokémon '{identifier}' not found"), 404
     
-    # Get adjacent Pokémon for navigation
-    prev_pokemon = Pokemon.query.filter(Pokemon.number < pokemon.number).order_by(Pokemon.number.desc()).first()
-    next_pokemon = Pokemon.query.filter(Pokemon.number > pokemon.number).order_by(Pokemon.number.asc()).first()
-    
-    # Get local images for carousel
-    images = PokemonImage.query.filter_by(pokemon_id=pokemon.id).order_by(PokemonImage.order).all()
-    
+    # Both adjacent Pokémon in one round-trip: scalar subqueries pick the
+    # neighboring numbers and the outer query fetches those rows
+    from sqlalchemy import func, select
+
+    prev_num = select(func.max(Pokemon.number)).where(Pokemon.number < pokemon.number).scalar_subquery()
+    next_num = select(func.min(Pokemon.number)).where(Pokemon.number > pokemon.number).scalar_subquery()
+    neighbors = Pokemon.query.filter(Pokemon.number.in_([prev_num, next_num])).order_by(Pokemon.number).all()
+    prev_pokemon = neighbors[0] if neighbors and neighbors[0].number < pokemon.number else None
+    next_pokemon = neighbors[-1] if neighbors and neighbors[-1].number > pokemon.number else None
+
+    # Carousel images come off the relationship (one SELECT) instead of a
+    # hand-built PokemonImage query
+    images = sorted(pokemon.images, key=lambda img: img.order or 0)
+
     return render_template('pokemon_detail.html',
                          pokemon=pokemon,
                          images=images,
@@ -245,19 +706,19 @@ def pokemon_detail(identifier):
 @app.route('/api/pokemon/<identifier>')
 def api_pokemon(identifier):
     """API endpoint to get Pokémon data as JSON"""
-    pokemon = get_pokemon_by_name(identifier)
-    
-    if not pokemon:
+    pokemon_id = _pokemon_id_by_name((identifier or '').strip().lower())
+
+    if not pokemon_id:
         try:
-            number = int(identifier)
-            pokemon = get_pokemon_by_number(number)
+            pokemon_id = _pokemon_id_by_number(int(identifier))
         except ValueError:
             pass
-    
-    if not pokemon:
+
+    pokemon_view = _pokemon_view(pokemon_id) if pokemon_id else None
+    if not pokemon_view:
         return jsonify({'error': 'Pokémon not found'}), 404
-    
-    return jsonify(pokemon.to_dict())
+
+    return jsonify(pokemon_view)
 
 @app.route('/api/pokemon/<int:pokemon_id>/images')
 def api_pokemon_images(pokemon_id):
@@ -276,45 +737,57 @@ def search():
     page = request.args.get('page', 1, type=int)
     per_page = 24
     
-    # Build query
-    filters = []
-    
+    # Filter over the cached snapshot: the ilike('%q%') version forced a full
+    # table scan on every keystroke of the live search UI, while a substring
+    # test over ~1k cached dicts is pure memory access.
+    results = _pokemon_snapshot()
+
     if query:
-        filters.append(Pokemon.name.ilike(f'%{query}%'))
-    
+        results = [p for p in results if query in p['name'].lower()]
+
     if pokemon_type:
-        filters.append(
-            (Pokemon.main_type.ilike(pokemon_type)) | 
-            (Pokemon.secondary_type.ilike(pokemon_type))
-        )
-    
+        results = [
+            p for p in results
+            if (p['main_type'] or '').lower() == pokemon_type
+            or (p['secondary_type'] or '').lower() == pokemon_type
+        ]
+
     if min_attack:
-        filters.append(Pokemon.attack >= min_attack)
-    
+        results = [p for p in results if p['attack'] and p['attack'] >= min_attack]
+
     if min_defense:
-        filters.append(Pokemon.defense >= min_defense)
-    
+        results = [p for p in results if p['defense'] and p['defense'] >= min_defense]
+
     if min_stamina:
-        filters.append(Pokemon.stamina >= min_stamina)
-    
-    # Execute query
-    base_query = Pokemon.query
-    if filters:
-        from sqlalchemy import and_
-        base_query = base_query.filter(and_(*filters))
-    
-    results = base_query.order_by(Pokemon.number).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
-    
+        results = [p for p in results if p['stamina'] and p['stamina'] >= min_stamina]
+
+    # ?after=<number> pages with a keyset cursor through the (number-ordered)
+    # filtered list, so clients streaming results page-by-page don't depend
+    # on page numbers shifting as filters change
+    after = request.args.get('after', type=int)
+    if after is not None:
+        start = next((i for i, p in enumerate(results) if p['number'] > after), len(results))
+        items = results[start:start + per_page]
+        has_next = start + per_page < len(results)
+        return jsonify({
+            'results': items,
+            'pagination': {
+                'total': len(results),
+                'has_next': has_next,
+                'next_cursor': items[-1]['number'] if has_next and items else None
+            }
+        })
+
+    pagination = SimplePagination(results, page, per_page)
+
     return jsonify({
-        'results': [p.to_dict() for p in results.items],
+        'results': pagination.items,
         'pagination': {
-            'page': results.page,
-            'total_pages': results.pages,
-            'total': results.total,
-            'has_next': results.has_next,
-            'has_prev': results.has_prev
+            'page': pagination.page,
+            'total_pages': pagination.pages,
+            'total': pagination.total,
+            'has_next': pagination.has_next,
+            'has_prev': pagination.has_prev
         }
     })
 
@@ -337,40 +810,49 @@ def predict():
     if not allowed_file(file.filename):
         return jsonify({'error': 'Invalid file type'}), 400
     
-    filepath = None
     try:
-        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-        filepath = os.path.join(UPLOAD_FOLDER, 'temp_upload.png')
-        file.save(filepath)
-        
+        # The upload stays in memory for its whole lifetime: decoded straight
+        # from the request buffer, never written to disk
+        data = file.read()
+        if not data:
+            return jsonify({'error': 'Empty file'}), 400
+
         model_loaded = ensure_tf_loaded()
-        
+
         if model_loaded and model is not None:
             print("Using ML model for prediction...")
-            img = preprocess_image(filepath)
+            img = preprocess_image_bytes(data)
             if img is None:
                 return jsonify({'error': 'Failed to process image'}), 400
             
-            predictions = model.predict(img, verbose=0)
-            predicted_idx = np.argmax(predictions[0])
-            confidence = float(np.max(predictions[0])) * 100
-            pokemon_name = class_labels.get(predicted_idx, 'Unknown')
-            
-            top_3_indices = np.argsort(predictions[0])[-3:][::-1]
-            top_3 = []
-            for idx in top_3_indices:
-                if idx in class_labels:
-                    top_3.append({
-                        'name': class_labels[idx],
-                        'confidence': float(predictions[0][idx]) * 100
-                    })
+            probabilities = predict_probabilities(img)
+            # Partial selection of the top 3, then sort just those three —
+            # avoids a full argsort of the class vector after every inference
+            top_3_indices = np.argpartition(probabilities, -3)[-3:]
+            top_3_indices = top_3_indices[np.argsort(probabilities[top_3_indices])[::-1]]
+            predicted_idx = top_3_indices[0]
+            confidence = float(probabilities[predicted_idx]) * 100
+            # Class indices are dense 0..N-1, so positional indexing into the
+            # ordered label list replaces the per-request dict probes
+            labels = class_label_list
+            pokemon_name = labels[predicted_idx] if predicted_idx < len(labels) else 'Unknown'
+
+            top_3 = [
+                {
+                    'name': labels[idx],
+                    'confidence': float(probabilities[idx]) * 100
+                }
+                for idx in top_3_indices if idx < len(labels)
+            ]
         else:
             print("Using fallback prediction mode...")
             import hashlib
-            with open(filepath, 'rb') as f:
-                file_hash = int(hashlib.md5(f.read()).hexdigest(), 16)
+            # 64-bit BLAKE2 fingerprint of the in-memory upload: no hex
+            # round-trip, and plenty of bits for the modulo below
+            file_hash = int.from_bytes(
+                hashlib.blake2b(data, digest_size=8).digest(), 'little')
             
-            pokemon_list = list(class_labels.values())
+            pokemon_list = class_label_list
             selected_idx = file_hash % len(pokemon_list)
             pokemon_name = pokemon_list[selected_idx]
             confidence = 65.0 + (file_hash % 25)
@@ -398,34 +880,52 @@ def predict():
     except Exception as e:
         print(f"Prediction error: {e}")
         return jsonify({'error': str(e)}), 500
-    finally:
-        if filepath and os.path.exists(filepath):
-            os.remove(filepath)
 
 @app.route('/api/random')
 def random_pokemon():
     """Get a random Pokémon"""
-    from sqlalchemy.sql.expression import func
-    pokemon = Pokemon.query.order_by(func.random()).first()
-    if pokemon:
-        return jsonify(pokemon.to_dict())
+    sampled = sample_random_pokemon(1)
+    if sampled:
+        return jsonify(sampled[0].to_dict())
     return jsonify({'error': 'No Pokémon found'}), 404
 
-@app.route('/api/stats')
-def api_stats():
-    """Get database statistics"""
+@cache.cached(timeout=300, key_prefix='api_stats')
+def _compute_api_stats():
+    """Counts and type distribution, snapshotted for 5 minutes: these numbers
+    barely change, and polling dashboards would otherwise rescan the table
+    per hit. The Pokémon write events drop the key early."""
     total_pokemon = Pokemon.query.count()
     total_images = PokemonImage.query.count()
     types = db.session.query(Pokemon.main_type, db.func.count(Pokemon.id)).group_by(Pokemon.main_type).all()
-    
-    return jsonify({
+
+    return {
         'total_pokemon': total_pokemon,
         'total_images': total_images,
         'types_distribution': {t: c for t, c in types}
-    })
+    }
+
+
+@app.route('/api/stats')
+def api_stats():
+    """Get database statistics"""
+    return jsonify(_compute_api_stats())
 
 # ==================== FAVORITES ====================
 
+def favorite_ids(user):
+    """The user's favorited Pokémon ids as a set, fetched once per request.
+
+    The UI checks favorite status for every card on a page; caching the id
+    set on flask.g turns N membership checks into one SELECT + O(1) lookups.
+    """
+    if not hasattr(g, '_favorite_ids'):
+        g._favorite_ids = {
+            row[0]
+            for row in db.session.query(Favorite.pokemon_id).filter_by(user_id=user.id)
+        }
+    return g._favorite_ids
+
+
 @app.route('/favorites')
 def favorites_page():
     """User's favorites page"""
@@ -433,7 +933,9 @@ def favorites_page():
     if not user:
         return redirect(url_for('auth.login', next=request.url))
     
-    favorites = Favorite.query.filter_by(user_id=user.id).order_by(Favorite.created_at.desc()).all()
+    favorites = Favorite.query.options(
+        joinedload(Favorite.pokemon).selectinload(Pokemon.images)
+    ).filter_by(user_id=user.id).order_by(Favorite.created_at.desc()).all()
     return render_template('favorites.html', favorites=favorites)
 
 @app.route('/api/favorites', methods=['GET'])
@@ -443,7 +945,11 @@ def api_get_favorites():
     if not user:
         return jsonify({'error': 'Login required'}), 401
     
-    favorites = Favorite.query.filter_by(user_id=user.id).all()
+    # The stored summary covers the list payload, so the Pokémon join is
+    # skipped; only rows predating the column lazy-load their Pokémon
+    favorites = Favorite.query.options(
+        lazyload(Favorite.pokemon)
+    ).filter_by(user_id=user.id).all()
     return jsonify([f.to_dict() for f in favorites])
 
 @app.route('/api/favorites/<int:pokemon_id>', methods=['POST'])
@@ -461,7 +967,8 @@ def api_add_favorite(pokemon_id):
     if existing:
         return jsonify({'error': 'Already in favorites'}), 400
     
-    favorite = Favorite(user_id=user.id, pokemon_id=pokemon_id)
+    favorite = Favorite(user_id=user.id, pokemon_id=pokemon_id,
+                        pokemon_summary=Favorite.summarize(pokemon))
     db.session.add(favorite)
     db.session.commit()
     
@@ -490,8 +997,17 @@ def api_check_favorite(pokemon_id):
     if not user:
         return jsonify({'is_favorite': False})
     
-    is_fav = Favorite.query.filter_by(user_id=user.id, pokemon_id=pokemon_id).first() is not None
-    return jsonify({'is_favorite': is_fav})
+    return jsonify({'is_favorite': pokemon_id in favorite_ids(user)})
+
+@app.route('/api/favorites/ids')
+def api_favorite_ids():
+    """Get all favorited Pokémon ids at once, so the client can check cards
+    locally instead of one /api/favorites/check call per card"""
+    user = get_current_user()
+    if not user:
+        return jsonify({'ids': []})
+
+    return jsonify({'ids': sorted(favorite_ids(user))})
 
 # ==================== TEAM BUILDER ====================
 
@@ -501,8 +1017,10 @@ def team_builder():
     user = get_current_user()
     teams = []
     if user:
-        teams = Team.query.filter_by(user_id=user.id).order_by(Team.updated_at.desc()).all()
-    
+        teams = Team.query.options(
+            selectinload(Team.members).joinedload(TeamMember.pokemon)
+        ).filter_by(user_id=user.id).order_by(Team.updated_at.desc()).all()
+
     pokemon_list = Pokemon.query.order_by(Pokemon.number).all()
     return render_template('team_builder.html', teams=teams, pokemon_list=pokemon_list, types=PokemonType.get_type_data())
 
@@ -554,16 +1072,20 @@ def api_update_team(team_id):
     
     if 'members' in data:
         TeamMember.query.filter_by(team_id=team.id).delete()
-        for member_data in data['members']:
-            if member_data.get('pokemon_id'):
-                member = TeamMember(
-                    team_id=team.id,
-                    pokemon_id=member_data['pokemon_id'],
-                    slot=member_data['slot'],
-                    nickname=member_data.get('nickname')
-                )
-                db.session.add(member)
-    
+        # One bulk INSERT for all slots instead of an ORM flush per member
+        members = [
+            TeamMember(
+                team_id=team.id,
+                pokemon_id=member_data['pokemon_id'],
+                slot=member_data['slot'],
+                nickname=member_data.get('nickname')
+            )
+            for member_data in data['members']
+            if member_data.get('pokemon_id')
+        ]
+        if members:
+            db.session.bulk_save_objects(members)
+
     db.session.commit()
     return jsonify({'success': True, 'team': team.to_dict()})
 
@@ -634,16 +1156,13 @@ def quiz_page():
 @app.route('/api/quiz/question')
 def api_quiz_question():
     """Get a random quiz question"""
-    from sqlalchemy.sql.expression import func
-    
-    correct = Pokemon.query.order_by(func.random()).first()
-    if not correct:
+    sampled = sample_random_pokemon(4)
+    if not sampled:
         return jsonify({'error': 'No Pokemon available'}), 404
-    
-    wrong = Pokemon.query.filter(Pokemon.id != correct.id).order_by(func.random()).limit(3).all()
-    
+
+    correct, wrong = sampled[0], sampled[1:]
+
     options = [correct] + wrong
-    import random
     random.shuffle(options)
     
     return jsonify({
@@ -672,7 +1191,7 @@ def api_quiz_submit():
 def api_quiz_leaderboard():
     """Get quiz leaderboard"""
     scores = QuizScore.query.filter(QuizScore.user_id.isnot(None)).order_by(
-        (QuizScore.score * 100 / QuizScore.total_questions).desc(),
+        QuizScore.percent_score.desc(),
         QuizScore.created_at.desc()
     ).limit(20).all()
     
@@ -710,28 +1229,24 @@ def gallery():
     """Visual gallery of all Pokemon"""
     generation = request.args.get('gen', '')
     pokemon_type = request.args.get('type', '')
-    
-    query = Pokemon.query
-    
+
+    # Filter in Python over the cached snapshot (already ordered by number)
+    # instead of re-scanning the table on every gallery hit
+    pokemon_list = _pokemon_snapshot()
+
     if pokemon_type:
-        query = query.filter(
-            (Pokemon.main_type.ilike(pokemon_type)) | 
-            (Pokemon.secondary_type.ilike(pokemon_type))
-        )
-    
-    if generation:
-        gen_ranges = {
-            '1': (1, 151), '2': (152, 251), '3': (252, 386),
-            '4': (387, 493), '5': (494, 649), '6': (650, 721),
-            '7': (722, 809), '8': (810, 905), '9': (906, 1025)
-        }
-        if generation in gen_ranges:
-            start, end = gen_ranges[generation]
-            query = query.filter(Pokemon.number >= start, Pokemon.number <= end)
-    
-    pokemon_list = query.order_by(Pokemon.number).all()
-    
-    return render_template('gallery.html', 
+        wanted = pokemon_type.lower()
+        pokemon_list = [
+            p for p in pokemon_list
+            if (p['main_type'] or '').lower() == wanted
+            or (p['secondary_type'] or '').lower() == wanted
+        ]
+
+    if generation in GEN_RANGES:
+        start, end = GEN_RANGES[generation]
+        pokemon_list = [p for p in pokemon_list if start <= p['number'] <= end]
+
+    return render_template('gallery.html',
                           pokemon_list=pokemon_list, 
                           types=PokemonType.get_type_data(),
                           current_type=pokemon_type,
@@ -782,18 +1297,28 @@ def pokemon_of_the_day():
     """Get Pokemon of the day (changes daily)"""
     from datetime import date
     import hashlib
-    
+
+    # The answer only changes once per day, so the serialized dict is cached
+    # under a date-scoped key (shared across workers when Redis is configured)
+    # and everyone after the first request skips the COUNT + OFFSET queries.
     today = date.today().isoformat()
+    cache_key = f'pokemon_of_the_day:{today}'
+    data = cache.get(cache_key)
+    if data is not None:
+        return jsonify(data)
+
     day_hash = int(hashlib.md5(today.encode()).hexdigest(), 16)
-    
+
     total = Pokemon.query.count()
     if total == 0:
         return jsonify({'error': 'No Pokemon available'}), 404
-    
+
     offset = day_hash % total
     pokemon = Pokemon.query.order_by(Pokemon.number).offset(offset).first()
-    
-    return jsonify(pokemon.to_dict())
+
+    data = pokemon.to_dict()
+    cache.set(cache_key, data, timeout=86400)
+    return jsonify(data)
 
 # Error handlers
 @app.errorhandler(404)
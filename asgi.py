@@ -0,0 +1,17 @@
+"""
+ASGI entry point for Pokémon Knower.
+
+Wraps the existing WSGI app with asgiref's adapter so it can run behind an
+async server, where the event loop multiplexes the IO-bound endpoints
+(DB queries, /pokedata/* file streaming) across far more concurrent
+connections than the threaded worker model allows.
+
+Run with (set USE_ASGI=1 in docker-compose to use this in the container):
+    gunicorn -k uvicorn.workers.UvicornWorker asgi:asgi_app
+"""
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import app
+
+asgi_app = WsgiToAsgi(app)
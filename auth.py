@@ -3,12 +3,19 @@ Authentication module using Stytch
 Supports: Magic Link + Google OAuth
 """
 
+import hashlib
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
-from datetime import datetime
-from flask import Blueprint, request, redirect, url_for, session, jsonify, render_template, current_app
+from flask import Blueprint, g, request, redirect, url_for, session, jsonify, render_template, current_app
 import stytch
 
+from sqlalchemy import or_
+
+from extensions import cache, limiter
+from models import db, User
+
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
 # Stytch configuration (from environment variables)
@@ -23,11 +30,15 @@ def get_stytch_client():
     """Lazy initialization of Stytch client"""
     global stytch_client
     if stytch_client is None and STYTCH_PROJECT_ID and STYTCH_SECRET:
-        # Stytch v9.x uses environment parameter as string: 'test' or 'live'
+        from extensions import pooled_http_session
+        # Stytch v15.x takes environment as a string ('test' or 'live') and
+        # accepts a caller-provided sync_session; the pooled session keeps
+        # TLS connections to Stytch warm across calls.
         stytch_client = stytch.Client(
             project_id=STYTCH_PROJECT_ID,
             secret=STYTCH_SECRET,
-            environment=STYTCH_ENV  # 'test' or 'live'
+            environment=STYTCH_ENV,  # 'test' or 'live'
+            sync_session=pooled_http_session(),
         )
     return stytch_client
 
@@ -53,9 +64,8 @@ def admin_required(f):
     def decorated_function(*args, **kwargs):
         if 'user_id' not in session:
             return redirect(url_for('auth.login', next=request.url))
-        
-        from models import User
-        user = User.query.get(session['user_id'])
+
+        user = get_current_user()
         if not user or not user.is_admin:
             return jsonify({'error': 'Admin access required'}), 403
         return f(*args, **kwargs)
@@ -63,42 +73,85 @@ def admin_required(f):
 
 
 def get_current_user():
-    """Get the current logged-in user"""
+    """Get the current logged-in user.
+
+    The result is kept on flask.g for the rest of the request: the navbar
+    context processor, decorators and route bodies all call this, and without
+    the per-request cache each call would be its own SELECT.
+    """
     if 'user_id' not in session:
         return None
-    from models import User
-    return User.query.get(session['user_id'])
+    if not hasattr(g, '_current_user'):
+        g._current_user = db.session.get(User, session['user_id'])
+    return g._current_user
+
+
+@cache.memoize(timeout=300)
+def _user_view(user_id):
+    """Serialized user profile, cached (Redis-shared in production) so bursts
+    of /auth/me polling skip the row fetch. Login paths that touch the row
+    invalidate this explicitly."""
+    user = db.session.get(User, user_id)
+    return user.to_dict() if user else None
+
+
+def _invalidate_user_view(user_id):
+    """Drop the cached profile after a write to the user row"""
+    try:
+        cache.delete_memoized(_user_view, user_id)
+    except Exception:
+        pass  # Cache not initialized
 
 
 @auth_bp.route('/login')
 def login():
     """Login page with magic link and Google OAuth options"""
-    next_url = request.args.get('next', url_for('index'))
+    next_url = request.args.get('next') or url_for('index')
     return render_template('auth/login.html', next_url=next_url)
 
 
+# Delivery worker pool: the Stytch email round-trip (often hundreds of ms)
+# happens off the request thread so the endpoint answers in local time only
+_email_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='magic-link')
+
+
+def _deliver_magic_link(client, email, magic_link_url, attempts=3):
+    """Send the magic link email in the background, retrying transient errors"""
+    for attempt in range(attempts):
+        try:
+            client.magic_links.email.login_or_create(
+                email=email,
+                login_magic_link_url=magic_link_url,
+                signup_magic_link_url=magic_link_url,
+            )
+            return
+        except Exception as e:
+            if attempt == attempts - 1:
+                print(f"Magic link delivery failed for {email}: {e}")
+            else:
+                time.sleep(5)
+
+
 @auth_bp.route('/magic-link', methods=['POST'])
+@limiter.limit("5 per minute; 30 per hour")
+@limiter.limit("3 per minute", key_func=lambda: request.form.get('email', ''))
 def send_magic_link():
     """Send magic link email"""
     client = get_stytch_client()
     if not client:
         return jsonify({'error': 'Auth not configured'}), 500
-    
+
     email = request.form.get('email', '').strip().lower()
     if not email:
         return jsonify({'error': 'Email is required'}), 400
-    
-    next_url = request.form.get('next', url_for('index'))
-    
-    try:
-        response = client.magic_links.email.login_or_create(
-            email=email,
-            login_magic_link_url=f"{get_base_url()}/auth/authenticate?next={next_url}",
-            signup_magic_link_url=f"{get_base_url()}/auth/authenticate?next={next_url}",
-        )
-        return jsonify({'success': True, 'message': 'Check your email for the magic link!'})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+
+    next_url = request.form.get('next') or url_for('index')
+    magic_link_url = f"{get_base_url()}/auth/authenticate?next={next_url}"
+
+    # Queue the delivery and answer immediately; the email lands a moment
+    # later either way, and delivery failures are logged by the worker
+    _email_executor.submit(_deliver_magic_link, client, email, magic_link_url)
+    return jsonify({'success': True, 'message': 'Check your email for the magic link!'}), 202
 
 
 @auth_bp.route('/google')
@@ -108,7 +161,7 @@ def google_login():
     if not client:
         return redirect(url_for('auth.login', error='Auth not configured'))
     
-    next_url = request.args.get('next', url_for('index'))
+    next_url = request.args.get('next') or url_for('index')
     
     # Build the Google OAuth URL
     oauth_url = (
@@ -121,44 +174,62 @@ def google_login():
     return redirect(oauth_url)
 
 
+
+def _claim_auth_token(token):
+    """First-use guard for callback tokens.
+
+    Stytch (and impatient users) can deliver the same token twice; cache.add
+    is atomic (SETNX under Redis), so only the first claim wins and the
+    duplicate skips the authenticate round-trip entirely.
+    """
+    digest = hashlib.sha256(token.encode()).hexdigest()
+    try:
+        return cache.add(f'auth_token:{digest}', 1, timeout=120)
+    except Exception:
+        return True  # Cache not initialized; proceed without the guard
+
+
 @auth_bp.route('/authenticate')
 def authenticate_magic_link():
     """Handle magic link callback"""
-    from models import db, User
-    
     client = get_stytch_client()
     if not client:
         return redirect(url_for('auth.login', error='Auth not configured'))
     
     token = request.args.get('token')
-    next_url = request.args.get('next', url_for('index'))
+    next_url = request.args.get('next') or url_for('index')
     
     if not token:
         return redirect(url_for('auth.login', error='Invalid token'))
-    
+
+    if not _claim_auth_token(token):
+        return redirect(next_url)
+
     try:
         response = client.magic_links.authenticate(token=token)
         stytch_user = response.user
-        
-        # Find or create user in our database
-        user = User.query.filter_by(stytch_user_id=stytch_user.user_id).first()
-        
-        if not user:
-            # Check if email already exists (shouldn't happen, but handle gracefully)
-            user = User.query.filter_by(email=stytch_user.emails[0].email).first()
-            if user:
-                user.stytch_user_id = stytch_user.user_id
-            else:
-                user = User(
-                    stytch_user_id=stytch_user.user_id,
-                    email=stytch_user.emails[0].email,
-                    name=stytch_user.name.first_name if stytch_user.name else None,
-                )
-                db.session.add(user)
-        
-        user.last_login = datetime.utcnow()
+
+        # Find or create user; one SELECT covers both the returning-user
+        # (stytch id) and the email-already-registered case
+        user = User.query.filter(or_(
+            User.stytch_user_id == stytch_user.user_id,
+            User.email == stytch_user.emails[0].email,
+        )).first()
+
+        if user:
+            user.stytch_user_id = stytch_user.user_id
+        else:
+            user = User(
+                stytch_user_id=stytch_user.user_id,
+                email=stytch_user.emails[0].email,
+                name=stytch_user.name.first_name if stytch_user.name else None,
+            )
+            db.session.add(user)
+
+        user.last_login = db.func.now()
         db.session.commit()
-        
+        _invalidate_user_view(user.id)
+
         # Set session
         session['user_id'] = user.id
         session['stytch_session_token'] = response.session_token
@@ -172,25 +243,23 @@ def authenticate_magic_link():
 @auth_bp.route('/oauth/callback')
 def oauth_callback():
     """Handle OAuth callback (Google)"""
-    from models import db, User
-    
     client = get_stytch_client()
     if not client:
         return redirect(url_for('auth.login', error='Auth not configured'))
     
     token = request.args.get('token')
-    next_url = request.args.get('next', url_for('index'))
+    next_url = request.args.get('next') or url_for('index')
     
     if not token:
         return redirect(url_for('auth.login', error='Invalid token'))
-    
+
+    if not _claim_auth_token(token):
+        return redirect(next_url)
+
     try:
         response = client.oauth.authenticate(token=token)
         stytch_user = response.user
-        
-        # Find or create user in our database
-        user = User.query.filter_by(stytch_user_id=stytch_user.user_id).first()
-        
+
         email = stytch_user.emails[0].email if stytch_user.emails else None
         name = None
         avatar_url = None
@@ -201,34 +270,33 @@ def oauth_callback():
         # Try to get avatar from OAuth provider
         if hasattr(response, 'provider_values') and response.provider_values:
             avatar_url = getattr(response.provider_values, 'profile_picture_url', None)
-        
-        if not user:
-            if email:
-                user = User.query.filter_by(email=email).first()
-            
-            if user:
-                user.stytch_user_id = stytch_user.user_id
-                if name:
-                    user.name = name
-                if avatar_url:
-                    user.avatar_url = avatar_url
-            else:
-                user = User(
-                    stytch_user_id=stytch_user.user_id,
-                    email=email,
-                    name=name,
-                    avatar_url=avatar_url,
-                )
-                db.session.add(user)
-        else:
+
+        # Find or create user; one SELECT covers both the returning-user
+        # (stytch id) and the email-already-registered case
+        criteria = [User.stytch_user_id == stytch_user.user_id]
+        if email:
+            criteria.append(User.email == email)
+        user = User.query.filter(or_(*criteria)).first()
+
+        if user:
+            user.stytch_user_id = stytch_user.user_id
             if name:
                 user.name = name
             if avatar_url:
                 user.avatar_url = avatar_url
-        
-        user.last_login = datetime.utcnow()
+        else:
+            user = User(
+                stytch_user_id=stytch_user.user_id,
+                email=email,
+                name=name,
+                avatar_url=avatar_url,
+            )
+            db.session.add(user)
+
+        user.last_login = db.func.now()
         db.session.commit()
-        
+        _invalidate_user_view(user.id)
+
         # Set session
         session['user_id'] = user.id
         session['stytch_session_token'] = response.session_token
@@ -265,7 +333,6 @@ def register():
             )
             
             # Create local user record
-            from models import db, User
             user = User(
                 stytch_user_id=response.user_id,
                 email=email,
@@ -273,7 +340,8 @@ def register():
             )
             db.session.add(user)
             db.session.commit()
-            
+            _invalidate_user_view(user.id)
+
             # Set session
             session['user_id'] = user.id
             session['stytch_session_token'] = response.session_token
@@ -306,7 +374,7 @@ def logout():
 @login_required
 def me():
     """Get current user info"""
-    user = get_current_user()
-    if not user:
+    user_view = _user_view(session['user_id'])
+    if not user_view:
         return jsonify({'error': 'Not authenticated'}), 401
-    return jsonify(user.to_dict())
+    return jsonify(user_view)
@@ -0,0 +1,79 @@
+"""
+One-time conversion of the Keras .h5 classifier to an int8-quantized TFLite
+model for cheap CPU inference. Uses images from PokemonData/ as the
+representative dataset for quantization calibration.
+
+Usage: python convert_tflite.py
+Output: pokemon_classifier_model_V3.int8.tflite (picked up by app.py when present)
+"""
+
+import os
+import random
+import sys
+
+import cv2
+import numpy as np
+
+MODEL_PATH = 'pokemon_classifier_model_V3.h5'
+OUTPUT_PATH = 'pokemon_classifier_model_V3.int8.tflite'
+POKEMON_DATA_DIR = os.environ.get('POKEMON_DATA_DIR', 'PokemonData')
+NUM_CALIBRATION_IMAGES = 200
+
+
+def find_sample_images(root_dir, limit):
+    """Collect a random sample of image paths from the dataset folders"""
+    paths = []
+    for dirpath, _, filenames in os.walk(root_dir):
+        for name in filenames:
+            if name.lower().endswith(('.png', '.jpg', '.jpeg')):
+                paths.append(os.path.join(dirpath, name))
+    random.shuffle(paths)
+    return paths[:limit]
+
+
+def main():
+    if not os.path.exists(MODEL_PATH):
+        print(f"Model not found: {MODEL_PATH}")
+        sys.exit(1)
+
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(MODEL_PATH, compile=False)
+    input_shape = model.input_shape
+    target_size = (input_shape[1], input_shape[2])
+
+    sample_paths = find_sample_images(POKEMON_DATA_DIR, NUM_CALIBRATION_IMAGES)
+    if not sample_paths:
+        print(f"No calibration images found under {POKEMON_DATA_DIR}/")
+        sys.exit(1)
+    print(f"Calibrating on {len(sample_paths)} images from {POKEMON_DATA_DIR}/")
+
+    def representative_dataset():
+        for path in sample_paths:
+            img = cv2.imread(path, cv2.IMREAD_COLOR)
+            if img is None:
+                continue
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+            img = cv2.resize(img, target_size, interpolation=cv2.INTER_AREA)
+            yield [img[np.newaxis].astype(np.float32) / 255.0]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.int8
+    converter.inference_output_type = tf.int8
+
+    print("Converting to int8 TFLite...")
+    tflite_model = converter.convert()
+
+    with open(OUTPUT_PATH, 'wb') as f:
+        f.write(tflite_model)
+
+    original_mb = os.path.getsize(MODEL_PATH) / (1024 * 1024)
+    converted_mb = os.path.getsize(OUTPUT_PATH) / (1024 * 1024)
+    print(f"Wrote {OUTPUT_PATH}: {converted_mb:.1f} MB (was {original_mb:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -27,14 +27,21 @@ echo "📦 Starting Flask with Gunicorn..."
 echo "🗃️ Initializing database..."
 python -c "from app import app, db; app.app_context().push(); db.create_all(); print('✅ Database initialized')"
 
-exec gunicorn \
-    --bind 0.0.0.0:5000 \
-    --workers 4 \
-    --threads 2 \
-    --worker-class gthread \
-    --timeout 60 \
-    --access-logfile - \
-    --error-logfile - \
-    --log-level info \
-    --preload \
-    app:app
+# USE_ASGI=1 switches to the async worker (asgi.py), which multiplexes
+# IO-bound requests on an event loop instead of capping concurrency at
+# workers x threads
+if [ "${USE_ASGI:-0}" = "1" ]; then
+    exec gunicorn \
+        --bind 0.0.0.0:5000 \
+        --workers 4 \
+        --worker-class uvicorn.workers.UvicornWorker \
+        --timeout 60 \
+        --access-logfile - \
+        --error-logfile - \
+        --log-level info \
+        --preload \
+        asgi:asgi_app
+fi
+
+# Worker count/threads and preload behavior live in gunicorn.conf.py
+exec gunicorn -c gunicorn.conf.py app:app
@@ -3,8 +3,8 @@ Donations module using Stripe Checkout
 """
 
 import os
-from datetime import datetime
-from flask import Blueprint, request, redirect, url_for, jsonify, render_template, session
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, current_app, request, redirect, url_for, jsonify, render_template, session
 import stripe
 
 donations_bp = Blueprint('donations', __name__, url_prefix='/donate')
@@ -16,6 +16,13 @@ STRIPE_WEBHOOK_SECRET = os.environ.get('STRIPE_WEBHOOK_SECRET', '')
 
 stripe.api_key = STRIPE_SECRET_KEY
 
+from models import db, Donation
+
+# Route all Stripe API calls through a pooled session so checkout/webhook
+# handling reuses warm TLS connections instead of handshaking per call
+from extensions import cache, limiter, pooled_http_session
+stripe.default_http_client = stripe.http_client.RequestsClient(session=pooled_http_session())
+
 
 def get_base_url():
     """Get the base URL for callbacks"""
@@ -29,10 +36,9 @@ def donate_page():
 
 
 @donations_bp.route('/create-session', methods=['POST'])
+@limiter.limit("10 per minute")
 def create_checkout_session():
     """Create a Stripe Checkout session"""
-    from models import db, Donation
-    
     if not STRIPE_SECRET_KEY:
         return jsonify({'error': 'Stripe not configured'}), 500
     
@@ -102,25 +108,38 @@ def create_checkout_session():
 @donations_bp.route('/success')
 def donation_success():
     """Handle successful donation"""
-    from models import db, Donation
-    
     session_id = request.args.get('session_id')
-    
+
     if session_id:
         # Update donation status
         donation = Donation.query.filter_by(stripe_session_id=session_id).first()
+
+        # Already verified on a previous visit (refresh, back button, shared
+        # URL) - nothing left to do, skip the Stripe round-trip entirely
+        if donation and donation.status == 'succeeded':
+            return render_template('donate_success.html')
+
         if donation and donation.status == 'pending':
             try:
-                # Verify with Stripe
-                checkout_session = stripe.checkout.Session.retrieve(session_id)
-                if checkout_session.payment_status == 'paid':
+                # Verify with Stripe; cache the verdict briefly so repeated
+                # landings while pending don't each pay the API call
+                cache_key = f'stripe_session:{session_id}'
+                session_info = cache.get(cache_key)
+                if session_info is None:
+                    checkout_session = stripe.checkout.Session.retrieve(session_id)
+                    session_info = {
+                        'payment_status': checkout_session.payment_status,
+                        'payment_intent': checkout_session.payment_intent,
+                    }
+                    cache.set(cache_key, session_info, timeout=600)
+                if session_info['payment_status'] == 'paid':
                     donation.status = 'succeeded'
-                    donation.stripe_payment_intent_id = checkout_session.payment_intent
-                    donation.completed_at = datetime.utcnow()
+                    donation.stripe_payment_intent_id = session_info['payment_intent']
+                    donation.completed_at = db.func.now()
                     db.session.commit()
             except:
                 pass
-    
+
     return render_template('donate_success.html')
 
 
@@ -130,17 +149,42 @@ def donation_cancel():
     return render_template('donate_cancel.html')
 
 
+# The only event types this app acts on; everything else is acknowledged
+# right after signature verification without touching the database
+_HANDLED_WEBHOOK_EVENTS = frozenset({'checkout.session.completed', 'checkout.session.expired'})
+
+# Webhook events are applied off the request thread so the handler answers
+# Stripe inside its delivery timeout; a slow DB write would otherwise trigger
+# redundant retries. Single worker keeps events for a session in order.
+_webhook_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='stripe-webhook')
+
+
+def _apply_webhook_event(app, event_type, session_id, payment_intent):
+    """Apply a verified Stripe event to the matching donation row"""
+    with app.app_context():
+        donation = Donation.query.filter_by(stripe_session_id=session_id).first()
+        if not donation:
+            return
+
+        if event_type == 'checkout.session.completed':
+            donation.status = 'succeeded'
+            donation.stripe_payment_intent_id = payment_intent
+            donation.completed_at = db.func.now()
+            db.session.commit()
+        elif event_type == 'checkout.session.expired' and donation.status == 'pending':
+            donation.status = 'expired'
+            db.session.commit()
+
+
 @donations_bp.route('/webhook', methods=['POST'])
 def stripe_webhook():
     """Handle Stripe webhook events"""
-    from models import db, Donation
-    
     payload = request.get_data()
     sig_header = request.headers.get('Stripe-Signature')
-    
+
     if not STRIPE_WEBHOOK_SECRET:
         return jsonify({'error': 'Webhook not configured'}), 400
-    
+
     try:
         event = stripe.Webhook.construct_event(
             payload, sig_header, STRIPE_WEBHOOK_SECRET
@@ -149,24 +193,17 @@ def stripe_webhook():
         return jsonify({'error': 'Invalid payload'}), 400
     except stripe.error.SignatureVerificationError:
         return jsonify({'error': 'Invalid signature'}), 400
-    
-    # Handle the event
-    if event['type'] == 'checkout.session.completed':
-        session_data = event['data']['object']
-        
-        donation = Donation.query.filter_by(stripe_session_id=session_data['id']).first()
-        if donation:
-            donation.status = 'succeeded'
-            donation.stripe_payment_intent_id = session_data.get('payment_intent')
-            donation.completed_at = datetime.utcnow()
-            db.session.commit()
-    
-    elif event['type'] == 'checkout.session.expired':
-        session_data = event['data']['object']
-        
-        donation = Donation.query.filter_by(stripe_session_id=session_data['id']).first()
-        if donation and donation.status == 'pending':
-            donation.status = 'expired'
-            db.session.commit()
-    
-    return jsonify({'status': 'success'})
+
+    if event['type'] not in _HANDLED_WEBHOOK_EVENTS:
+        return jsonify({'status': 'ignored'})
+
+    # Signature is verified; queue the DB update and acknowledge immediately
+    session_data = event['data']['object']
+    _webhook_executor.submit(
+        _apply_webhook_event,
+        current_app._get_current_object(),
+        event['type'],
+        session_data['id'],
+        session_data.get('payment_intent'),
+    )
+    return jsonify({'status': 'queued'})
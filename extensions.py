@@ -0,0 +1,47 @@
+"""
+Shared Flask extensions.
+Instantiated here so blueprints can import them without circular imports;
+initialized against the app in app.py.
+"""
+
+import os
+
+import requests
+from flask import request
+from flask_caching import Cache
+from flask_limiter import Limiter
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Backed by Redis when REDIS_URL is set (production), SimpleCache otherwise (local dev)
+cache = Cache()
+
+
+def _client_ip():
+    """Rate-limit key: the real client IP when behind the reverse proxy"""
+    forwarded = request.headers.get('X-Forwarded-For')
+    return forwarded.split(',')[0].strip() if forwarded else request.remote_addr
+
+
+# Throttles the endpoints that call paid external APIs (Stytch, Stripe).
+# Counters live in Redis in production so limits hold across workers.
+limiter = Limiter(
+    key_func=_client_ip,
+    storage_uri=os.environ.get('REDIS_URL') or 'memory://',
+)
+
+
+def pooled_http_session():
+    """A requests.Session with connection pooling and retry on 5xx.
+
+    Shared by the Stytch and Stripe SDK clients so their API calls reuse
+    warm TLS connections instead of paying a handshake per request.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=20,
+        pool_maxsize=50,
+        max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504]),
+    )
+    session.mount('https://', adapter)
+    return session
@@ -0,0 +1,21 @@
+"""
+Gunicorn configuration for Pokémon Knower.
+
+Workers are sized from the host CPU count (override with WEB_CONCURRENCY),
+each serving 4 threads for concurrent IO-bound requests. preload_app loads
+the app — and, with FLASK_WARMUP=1, the classifier — once in the master
+before forking, so workers share the model memory copy-on-write instead of
+loading it N times.
+"""
+
+import os
+
+bind = '0.0.0.0:5000'
+workers = int(os.environ.get('WEB_CONCURRENCY', max(2, (os.cpu_count() or 2) // 2)))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+preload_app = True
+timeout = 60
+accesslog = '-'
+errorlog = '-'
+loglevel = 'info'
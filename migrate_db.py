@@ -9,11 +9,14 @@ import os
 import csv
 import sys
 import re
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 # Add the project root to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+import sqlalchemy as sa
 from flask import Flask
 from models import db, Pokemon, PokemonImage, PokemonType
 
@@ -34,6 +37,10 @@ def resolve_pokemon_data_dir() -> str:
     return 'PokemonData'
 
 POKEMON_DATA_DIR = resolve_pokemon_data_dir()
+
+# Image extensions accepted by the scan, compared against rpartition output
+# so the hot loops skip os.path.splitext's tuple allocation per entry
+VALID_IMAGE_EXTENSIONS = frozenset({'png', 'jpg', 'jpeg', 'gif', 'webp'})
 MAX_POKEDEX_NUMBER_RAW = (os.environ.get('MAX_POKEDEX_NUMBER', '') or '').strip()
 MAX_POKEDEX_NUMBER = int(MAX_POKEDEX_NUMBER_RAW) if MAX_POKEDEX_NUMBER_RAW else None
 
@@ -49,124 +56,136 @@ def get_database_uri():
 def create_app():
     """Create Flask app for database context"""
     app = Flask(__name__)
-    app.config['SQLALCHEMY_DATABASE_URI'] = get_database_uri()
+    database_uri = get_database_uri()
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    if database_uri.startswith('postgresql'):
+        # psycopg2 fast-execution helpers: page the executemany batches
+        # through execute_values/execute_batch instead of one INSERT per row
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            'executemany_mode': 'values_plus_batch',
+            'executemany_values_page_size': 1000,
+            'executemany_batch_page_size': 500,
+        }
     db.init_app(app)
+
+    with app.app_context():
+        if db.engine.url.drivername.startswith('sqlite'):
+            # One-shot rebuildable migration: relax SQLite durability so the
+            # image scan isn't paced by fsyncs on every commit
+            @sa.event.listens_for(db.engine, 'connect')
+            def _migration_pragmas(dbapi_conn, _record):
+                cur = dbapi_conn.cursor()
+                cur.execute('PRAGMA synchronous=OFF')
+                cur.execute('PRAGMA journal_mode=MEMORY')
+                cur.execute('PRAGMA temp_store=MEMORY')
+                cur.execute('PRAGMA cache_size=-200000')
+                cur.close()
+
     return app
 
 def parse_int(value, default=0):
     """Safely parse integer from string"""
+    if not value:
+        return default
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        s = value.strip()
+        # Plain digit strings (the common CSV case) skip exception handling
+        if s.isdigit() or (s[:1] == '-' and s[1:].isdigit()):
+            return int(s)
     try:
-        return int(value) if value else default
+        return int(value)
     except (ValueError, TypeError):
         return default
 
+def csv_row_record(row):
+    """Map one CSV row to a dict of Pokemon column values (insert and update share it)"""
+    return {
+        'number': parse_int(row.get('number', 0)),
+        'name': (row.get('pokemon_name', '') or '').strip(),
+        'main_type': row.get('main_type', 'Normal'),
+        'secondary_type': row.get('secondary_type', '') or None,
+        'region': row.get('region', 'Kanto'),
+        'category': row.get('category', ''),
+        'height': row.get('height', ''),
+        'weight': row.get('weight', ''),
+        'pokemon_family': row.get('pokemon_family', ''),
+        'attack': parse_int(row.get('attack', 0)),
+        'defense': parse_int(row.get('defense', 0)),
+        'stamina': parse_int(row.get('stamina', 0)),
+        'cp_range': row.get('cp_range', ''),
+        'hp_range': row.get('hp_range', ''),
+        'capture_rate': row.get('capture_rate', ''),
+        'flee_rate': row.get('flee_rate', ''),
+        'male_perc': row.get('male_perc', ''),
+        'female_perc': row.get('female_perc', ''),
+        'resistance': row.get('resistance', ''),
+        'weakness': row.get('weakness', ''),
+        'wild_avail': row.get('wild_avail', ''),
+        'egg_avail': row.get('egg_avail', ''),
+        'raid_avail': row.get('raid_avail', ''),
+        'research_avail': row.get('research_avail', ''),
+        'shiny': row.get('shiny', ''),
+        'shadow': row.get('shadow', ''),
+        'pokedex_desc': row.get('pkedex_desc', ''),
+        'possible_attacks': row.get('poss_attacks', ''),
+        'pic_url': row.get('pic_url', ''),
+    }
+
 def migrate_csv_data(app):
     """Import Pokémon data from CSV to database (idempotent upsert)"""
     print("Starting CSV migration...")
-    
+
     with app.app_context():
         # Create all tables
         db.create_all()
-        
+
         # Read CSV and import
         if not os.path.exists(CSV_PATH):
             print(f"Error: {CSV_PATH} not found!")
             return False
-        
+
         with open(CSV_PATH, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            count = 0
-            
-            for row in reader:
-                number = parse_int(row.get('number', 0))
-                if number <= 0:
+            records = []
+            for row in csv.DictReader(f):
+                record = csv_row_record(row)
+                if record['number'] <= 0 or not record['name']:
                     continue
-
-                if MAX_POKEDEX_NUMBER and number > MAX_POKEDEX_NUMBER:
+                if MAX_POKEDEX_NUMBER and record['number'] > MAX_POKEDEX_NUMBER:
                     continue
+                records.append(record)
 
-                name = (row.get('pokemon_name', '') or '').strip()
-                if not name:
-                    continue
+        # Upsert with two executemany statements (insert new numbers, update
+        # existing rows by primary key) instead of a SELECT plus ORM
+        # unit-of-work flush per row
+        existing_ids = dict(db.session.query(Pokemon.number, Pokemon.id))
+        to_insert = [r for r in records if r['number'] not in existing_ids]
+        to_update = [
+            dict(r, id=existing_ids[r['number']])
+            for r in records if r['number'] in existing_ids
+        ]
+        if to_insert:
+            db.session.execute(sa.insert(Pokemon), to_insert)
+        if to_update:
+            db.session.execute(sa.update(Pokemon), to_update)
+        db.session.commit()
+        print(f"Imported {len(records)} Pokémon from CSV")
 
-                # Upsert: update if exists, insert if not
-                existing = Pokemon.query.filter_by(number=number).first()
-                if existing:
-                    existing.name = name
-                    existing.main_type = row.get('main_type', 'Normal')
-                    existing.secondary_type = row.get('secondary_type', '') or None
-                    existing.region = row.get('region', 'Kanto')
-                    existing.category = row.get('category', '')
-                    existing.height = row.get('height', '')
-                    existing.weight = row.get('weight', '')
-                    existing.pokemon_family = row.get('pokemon_family', '')
-                    existing.attack = parse_int(row.get('attack', 0))
-                    existing.defense = parse_int(row.get('defense', 0))
-                    existing.stamina = parse_int(row.get('stamina', 0))
-                    existing.cp_range = row.get('cp_range', '')
-                    existing.hp_range = row.get('hp_range', '')
-                    existing.capture_rate = row.get('capture_rate', '')
-                    existing.flee_rate = row.get('flee_rate', '')
-                    existing.male_perc = row.get('male_perc', '')
-                    existing.female_perc = row.get('female_perc', '')
-                    existing.resistance = row.get('resistance', '')
-                    existing.weakness = row.get('weakness', '')
-                    existing.wild_avail = row.get('wild_avail', '')
-                    existing.egg_avail = row.get('egg_avail', '')
-                    existing.raid_avail = row.get('raid_avail', '')
-                    existing.research_avail = row.get('research_avail', '')
-                    existing.shiny = row.get('shiny', '')
-                    existing.shadow = row.get('shadow', '')
-                    existing.pokedex_desc = row.get('pkedex_desc', '')
-                    existing.possible_attacks = row.get('poss_attacks', '')
-                    existing.pic_url = row.get('pic_url', '')
-                else:
-                    pokemon = Pokemon(
-                        number=number,
-                        name=name,
-                        main_type=row.get('main_type', 'Normal'),
-                        secondary_type=row.get('secondary_type', '') or None,
-                        region=row.get('region', 'Kanto'),
-                        category=row.get('category', ''),
-                        height=row.get('height', ''),
-                        weight=row.get('weight', ''),
-                        pokemon_family=row.get('pokemon_family', ''),
-                        attack=parse_int(row.get('attack', 0)),
-                        defense=parse_int(row.get('defense', 0)),
-                        stamina=parse_int(row.get('stamina', 0)),
-                        cp_range=row.get('cp_range', ''),
-                        hp_range=row.get('hp_range', ''),
-                        capture_rate=row.get('capture_rate', ''),
-                        flee_rate=row.get('flee_rate', ''),
-                        male_perc=row.get('male_perc', ''),
-                        female_perc=row.get('female_perc', ''),
-                        resistance=row.get('resistance', ''),
-                        weakness=row.get('weakness', ''),
-                        wild_avail=row.get('wild_avail', ''),
-                        egg_avail=row.get('egg_avail', ''),
-                        raid_avail=row.get('raid_avail', ''),
-                        research_avail=row.get('research_avail', ''),
-                        shiny=row.get('shiny', ''),
-                        shadow=row.get('shadow', ''),
-                        pokedex_desc=row.get('pkedex_desc', ''),
-                        possible_attacks=row.get('poss_attacks', ''),
-                        pic_url=row.get('pic_url', '')
-                    )
-                    db.session.add(pokemon)
-                count += 1
-            
-            db.session.commit()
-            print(f"Imported {count} Pokémon from CSV")
-        
         return True
 
+# Separator translation and punctuation stripping fold into two passes over
+# the string instead of the old chain of replace/sub intermediates
+_NORM_TRANS = str.maketrans({'_': ' ', '-': ' '})
+_NORM_RE = re.compile(r"[^a-z0-9\s]")
+
+@functools.lru_cache(maxsize=4096)
 def normalize_folder_name(name: str) -> str:
-    name = (name or '').strip().lower()
-    name = name.replace('_', ' ').replace('-', ' ')
-    name = re.sub(r"[^a-z0-9\s]", " ", name)
-    name = ' '.join(name.split())
-    return name
+    if not name:
+        return ''
+    name = _NORM_RE.sub(" ", name.strip().lower().translate(_NORM_TRANS))
+    return ' '.join(name.split())
 
 def scan_local_images(app):
     """Scan static/images/ for Pokémon image folders and add to database (idempotent)"""
@@ -176,48 +195,57 @@ def scan_local_images(app):
         if not os.path.exists(IMAGES_DIR):
             os.makedirs(IMAGES_DIR, exist_ok=True)
         
-        # Clear existing images (will be re-scanned)
-        PokemonImage.query.delete()
-        db.session.commit()
-        
-        # Get all Pokémon from database
-        pokemon_list = Pokemon.query.all()
-        pokemon_by_name = {p.name.lower(): p for p in pokemon_list}
-        pokemon_by_norm_name = {normalize_folder_name(p.name): p for p in pokemon_list}
+        # Load what's already there keyed by (pokemon_id, path); the scan
+        # below builds the desired state and only the difference is written,
+        # so an unchanged re-run touches no rows instead of rewriting all
+        existing_images = {
+            (pid, path): (img_id, is_primary, order)
+            for img_id, pid, path, is_primary, order in db.session.execute(
+                sa.select(PokemonImage.id, PokemonImage.pokemon_id, PokemonImage.path,
+                          PokemonImage.is_primary, PokemonImage.order))
+        }
+
+        # Only id/name/number are needed for matching; plain Row tuples skip
+        # the mapped-instance construction and identity-map bookkeeping that
+        # Pokemon.query.all() would pay for every row
+        pokemon_list = db.session.execute(
+            sa.select(Pokemon.id, Pokemon.name, Pokemon.number)
+        ).all()
+        # Lowercase and normalized names never collide across Pokémon, so one
+        # combined map turns the two lookups per folder into single probes
+        name_to_pokemon = {}
+        for p in pokemon_list:
+            name_to_pokemon[p.name.lower()] = p
+            name_to_pokemon[normalize_folder_name(p.name)] = p
         pokemon_by_number = {p.number: p for p in pokemon_list}
         
-        image_count = 0
+        # Collect plain dicts and insert them in one executemany at the end;
+        # per-instance session.add would keep unit-of-work state for every file
+        image_rows = []
 
         # Track per-Pokémon ordering to avoid duplicate primaries when combining sources
         next_order_by_pokemon_id = {}
 
         def add_image(pokemon, filename: str, path: str):
-            nonlocal image_count
             current_order = next_order_by_pokemon_id.get(pokemon.id, 0)
-            pokemon_image = PokemonImage(
-                pokemon_id=pokemon.id,
-                filename=filename,
-                path=path,
-                is_primary=(current_order == 0),
-                order=current_order,
-            )
-            db.session.add(pokemon_image)
+            image_rows.append({
+                'pokemon_id': pokemon.id,
+                'filename': filename,
+                'path': path,
+                'is_primary': current_order == 0,
+                'order': current_order,
+            })
             next_order_by_pokemon_id[pokemon.id] = current_order + 1
-            image_count += 1
 
         # 1) Support flat numeric files directly in static/images (e.g. 1.jpeg -> Bulbasaur)
-        valid_extensions = {'.png', '.jpg', '.jpeg', '.gif', '.webp'}
-        flat_files = [
-            fn for fn in os.listdir(IMAGES_DIR)
-            if os.path.isfile(os.path.join(IMAGES_DIR, fn))
-        ]
+        with os.scandir(IMAGES_DIR) as it:
+            flat_files = [entry.name for entry in it if entry.is_file()]
 
         for filename in sorted(flat_files):
-            ext = os.path.splitext(filename)[1].lower()
-            if ext not in valid_extensions:
+            stem, _, ext = filename.rpartition('.')
+            if not stem or ext.lower() not in VALID_IMAGE_EXTENSIONS:
                 continue
 
-            stem = os.path.splitext(filename)[0]
             try:
                 number = int(stem)
             except ValueError:
@@ -230,76 +258,100 @@ def scan_local_images(app):
             img_path = f"images/{filename}"
             add_image(pokemon, filename=filename, path=img_path)
         
-        def scan_folder_tree(root_dir: str, path_prefix: str):
-            nonlocal image_count
+        def list_folder_images(folder_path: str):
+            """Enumerate valid image filenames in one folder, sorted"""
+            with os.scandir(folder_path) as sub:
+                images = [
+                    entry.name for entry in sub
+                    if entry.is_file()
+                    and entry.name.rpartition('.')[2].lower() in VALID_IMAGE_EXTENSIONS
+                ]
+            images.sort()
+            return images
 
+        def scan_folder_tree(root_dir: str, path_prefix: str):
             if not os.path.exists(root_dir):
                 return
 
-            for folder_name in os.listdir(root_dir):
-                folder_path = os.path.join(root_dir, folder_name)
-                
-                # Skip if not a directory
-                if not os.path.isdir(folder_path):
-                    continue
-                
-                # Try to match folder name to Pokémon
-                pokemon_name = normalize_folder_name(folder_name)
-                pokemon = pokemon_by_norm_name.get(pokemon_name)
-                
-                # Also try exact match
-                if not pokemon:
-                    pokemon = pokemon_by_name.get((folder_name or '').lower())
-                
+            # scandir DirEntry objects answer is_dir()/is_file() from the
+            # directory read itself, skipping the per-entry stat that the
+            # old listdir + os.path.isdir pass paid
+            with os.scandir(root_dir) as it:
+                folders = sorted(entry.name for entry in it if entry.is_dir(follow_symlinks=False))
+
+            # Match folders on this thread, enumerate their contents on a
+            # pool so the kernel overlaps the per-folder readdir chains; the
+            # rows themselves are appended here since the session isn't
+            # thread-safe
+            matched = []
+            for folder_name in folders:
+                # Try normalized, then exact lowercase, against the combined map
+                pokemon = name_to_pokemon.get(normalize_folder_name(folder_name))
                 if not pokemon:
-                    continue
-                
-                # Scan images in the folder
-                images = []
-                
-                for filename in os.listdir(folder_path):
-                    ext = os.path.splitext(filename)[1].lower()
-                    if ext in valid_extensions:
-                        images.append(filename)
-                
-                # Sort images and add to database
-                images.sort()
-                
-                for idx, filename in enumerate(images[:12]):  # Limit to 12 images per Pokémon
-                    img_path = f"{path_prefix}/{folder_name}/{filename}"
-
-                    add_image(pokemon, filename=filename, path=img_path)
+                    pokemon = name_to_pokemon.get((folder_name or '').lower())
+                if pokemon:
+                    matched.append((pokemon, folder_name))
+
+            if not matched:
+                return
+
+            with ThreadPoolExecutor(max_workers=16) as executor:
+                listings = executor.map(
+                    list_folder_images,
+                    [os.path.join(root_dir, folder_name) for _, folder_name in matched],
+                )
+                for (pokemon, folder_name), images in zip(matched, listings):
+                    for filename in images[:12]:  # Limit to 12 images per Pokémon
+                        img_path = f"{path_prefix}/{folder_name}/{filename}"
+
+                        add_image(pokemon, filename=filename, path=img_path)
 
         scan_folder_tree(IMAGES_DIR, 'images')
         scan_folder_tree(POKEMON_DATA_DIR, 'pokedata')
-        
+
+        desired = {(r['pokemon_id'], r['path']): r for r in image_rows}
+        to_insert = [r for key, r in desired.items() if key not in existing_images]
+        to_update = []
+        for key, r in desired.items():
+            found = existing_images.get(key)
+            if found and (found[1], found[2]) != (r['is_primary'], r['order']):
+                to_update.append({'id': found[0], 'is_primary': r['is_primary'], 'order': r['order']})
+        to_delete = [found[0] for key, found in existing_images.items() if key not in desired]
+
+        if to_insert:
+            db.session.execute(PokemonImage.__table__.insert(), to_insert)
+        if to_update:
+            db.session.execute(sa.update(PokemonImage), to_update)
+        if to_delete:
+            db.session.execute(sa.delete(PokemonImage).where(PokemonImage.id.in_(to_delete)))
         db.session.commit()
-        print(f"Added {image_count} local images to database")
+        print(f"Image sync: {len(to_insert)} added, {len(to_update)} reordered, "
+              f"{len(to_delete)} removed ({len(desired)} total)")
 
 def seed_type_data(app):
     """Seed the Pokémon types table (idempotent upsert)"""
     print("Seeding type data...")
     
     with app.app_context():
-        type_data = PokemonType.get_type_data()
-        count = 0
-        
-        for name, data in type_data.items():
-            existing = PokemonType.query.filter_by(name=name.capitalize()).first()
-            if existing:
-                existing.color = data['color']
-                existing.icon = data['icon']
-            else:
-                ptype = PokemonType(
-                    name=name.capitalize(),
-                    color=data['color'],
-                    icon=data['icon']
-                )
-                db.session.add(ptype)
-            count += 1
-        
+        rows = [
+            {'name': name.capitalize(), 'color': data['color'], 'icon': data['icon']}
+            for name, data in PokemonType.get_type_data().items()
+        ]
+
+        # One upsert statement against the unique name index instead of a
+        # SELECT round-trip per type
+        if db.engine.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(PokemonType.__table__).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['name'],
+            set_={'color': stmt.excluded.color, 'icon': stmt.excluded.icon},
+        )
+        db.session.execute(stmt)
         db.session.commit()
-        print(f"Synced {count} Pokémon types")
+        print(f"Synced {len(rows)} Pokémon types")
 
 def main():
     """Run the full migration"""
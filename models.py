@@ -3,8 +3,9 @@ Database models for Pokémon Knower
 Using SQLAlchemy with SQLite (local) or PostgreSQL (production)
 """
 
+import operator
+
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
 
 db = SQLAlchemy()
 
@@ -14,17 +15,27 @@ class User(db.Model):
     __tablename__ = 'users'
     
     id = db.Column(db.Integer, primary_key=True)
-    stytch_user_id = db.Column(db.String(255), unique=True, nullable=False)
-    email = db.Column(db.String(255), unique=True, nullable=False)
+    stytch_user_id = db.Column(db.String(255), unique=True, index=True, nullable=False)
+    email = db.Column(db.String(255), unique=True, index=True, nullable=False)
     name = db.Column(db.String(255), nullable=True)
     avatar_url = db.Column(db.String(500), nullable=True)
     role = db.Column(db.String(50), default='user')  # 'user', 'admin'
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    last_login = db.Column(db.DateTime, default=datetime.utcnow)
+    # Timestamps are generated DB-side: inserts carry no Python-built
+    # datetime and batched writes need no per-row value
+    created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
+    last_login = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
     
     # Relationship to donations
     donations = db.relationship('Donation', backref='user', lazy=True)
-    
+
+    __table_args__ = (
+        # Supports keyset pagination on (created_at, id); its leading
+        # created_at column also serves the new-users-this-week range count
+        db.Index('ix_users_created_id', created_at.desc(), id.desc()),
+        # Range scans for the active-users-this-week count
+        db.Index('ix_users_last_login', last_login),
+    )
+
     @property
     def is_admin(self):
         return self.role == 'admin'
@@ -46,7 +57,7 @@ class Donation(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
-    stripe_session_id = db.Column(db.String(255), unique=True, nullable=False)
+    stripe_session_id = db.Column(db.String(255), unique=True, index=True, nullable=False)
     stripe_payment_intent_id = db.Column(db.String(255), nullable=True)
     amount = db.Column(db.Integer, nullable=False)  # Amount in cents
     currency = db.Column(db.String(10), default='usd')
@@ -54,9 +65,19 @@ class Donation(db.Model):
     donor_email = db.Column(db.String(255), nullable=True)
     donor_name = db.Column(db.String(255), nullable=True)
     message = db.Column(db.Text, nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    completed_at = db.Column(db.DateTime, nullable=True)
-    
+    created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
+    completed_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Supports keyset pagination on (created_at, id)
+        db.Index('ix_donations_created_id', created_at.desc(), id.desc()),
+        # Partial index so the succeeded-only counts/sums on the dashboard
+        # scan just the succeeded rows (supported by PostgreSQL and SQLite)
+        db.Index('ix_donations_succeeded', 'id',
+                 postgresql_where=db.text("status = 'succeeded'"),
+                 sqlite_where=db.text("status = 'succeeded'")),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -121,39 +142,38 @@ class Pokemon(db.Model):
     # External image URL (from original CSV)
     pic_url = db.Column(db.String(500))
     
-    # Relationship to images
-    images = db.relationship('PokemonImage', backref='pokemon', lazy=True)
-    
+    # Batch-loaded: rendering a page of Pokémon pulls all their images in
+    # one WHERE pokemon_id IN (...) query instead of a lazy load per row
+    images = db.relationship('PokemonImage', backref='pokemon', lazy='selectin',
+                             order_by='PokemonImage.order')
+
+    __table_args__ = (
+        # Functional index so case-insensitive name lookups are an index
+        # probe on lower(name) instead of a per-row ILIKE scan
+        db.Index('ix_pokemon_name_lower', db.func.lower(name)),
+    )
+
+    # The columns to_dict serves, fixed once at class scope; the
+    # availability columns stay out to keep API payloads unchanged
+    _SERIALIZE_COLS = (
+        'id', 'number', 'name', 'main_type', 'secondary_type', 'region',
+        'category', 'height', 'weight', 'pokemon_family', 'attack',
+        'defense', 'stamina', 'cp_range', 'hp_range', 'capture_rate',
+        'flee_rate', 'male_perc', 'female_perc', 'resistance', 'weakness',
+        'pokedex_desc', 'possible_attacks', 'pic_url',
+    )
+    # attrgetter pulls all of them in one C-level call per instance instead
+    # of a Python-level getattr per column
+    _SERIALIZE_GET = operator.attrgetter(*_SERIALIZE_COLS)
+
     def to_dict(self):
         """Convert to dictionary for JSON responses"""
-        return {
-            'id': self.id,
-            'number': self.number,
-            'name': self.name,
-            'main_type': self.main_type,
-            'secondary_type': self.secondary_type,
-            'region': self.region,
-            'category': self.category,
-            'height': self.height,
-            'weight': self.weight,
-            'pokemon_family': self.pokemon_family,
-            'attack': self.attack,
-            'defense': self.defense,
-            'stamina': self.stamina,
-            'hp': self.stamina,  # Alias for compatibility
-            'cp_range': self.cp_range,
-            'hp_range': self.hp_range,
-            'capture_rate': self.capture_rate,
-            'flee_rate': self.flee_rate,
-            'male_perc': self.male_perc,
-            'female_perc': self.female_perc,
-            'resistance': self.resistance,
-            'weakness': self.weakness,
-            'pokedex_desc': self.pokedex_desc,
-            'possible_attacks': self.possible_attacks,
-            'pic_url': self.pic_url,
-            'images': [img.to_dict() for img in self.images]
-        }
+        d = dict(zip(self._SERIALIZE_COLS, self._SERIALIZE_GET(self)))
+        d['hp'] = d['stamina']  # Alias for compatibility
+        # selectin loading fills images at query time; an instance without
+        # them serializes an empty list rather than paying a lazy load
+        d['images'] = [img.to_dict() for img in self.images] if 'images' in self.__dict__ else []
+        return d
 
 
 class PokemonImage(db.Model):
@@ -166,6 +186,11 @@ class PokemonImage(db.Model):
     path = db.Column(db.String(500), nullable=False)  # Relative path from static
     is_primary = db.Column(db.Boolean, default=False)
     order = db.Column(db.Integer, default=0)
+
+    __table_args__ = (
+        # Covers the selectin batch load and its ORDER BY in one index
+        db.Index('ix_pokemon_images_pokemon_id_order', 'pokemon_id', 'order'),
+    )
     
     def to_dict(self):
         return {
@@ -184,19 +209,48 @@ class Favorite(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     pokemon_id = db.Column(db.Integer, db.ForeignKey('pokemon.id'), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
     notes = db.Column(db.Text, nullable=True)
-    
+    # Snapshot of the fields the favorites list renders, captured when the
+    # favorite is created; list reads serve this instead of joining and
+    # hydrating a full Pokémon row per favorite
+    pokemon_summary = db.Column(db.JSON, nullable=True)
+
     user = db.relationship('User', backref=db.backref('favorites', lazy=True))
-    pokemon = db.relationship('Pokemon', backref=db.backref('favorited_by', lazy=True))
+    # Always needed when rendering a favorite, so join it in up front
+    pokemon = db.relationship('Pokemon', lazy='joined', backref=db.backref('favorited_by', lazy=True))
     
-    __table_args__ = (db.UniqueConstraint('user_id', 'pokemon_id', name='unique_user_pokemon'),)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'pokemon_id', name='unique_user_pokemon'),
+        # Covering index for the per-Pokemon favorite counts on the dashboard
+        db.Index('ix_favorites_pokemon_id', 'pokemon_id'),
+        # Serves the favorites page: filter by user, newest first
+        db.Index('ix_favorites_user_created', user_id, created_at.desc()),
+    )
     
+    @staticmethod
+    def summarize(pokemon):
+        """The slice of a Pokémon the favorites list needs"""
+        return {
+            'id': pokemon.id,
+            'number': pokemon.number,
+            'name': pokemon.name,
+            'main_type': pokemon.main_type,
+            'secondary_type': pokemon.secondary_type,
+            'pic_url': pokemon.pic_url,
+            'image_path': pokemon.images[0].path if pokemon.images else None,
+        }
+
     def to_dict(self):
+        # Rows created before the summary column existed fall back to
+        # hydrating the related Pokémon
+        pokemon = self.pokemon_summary
+        if pokemon is None and self.pokemon:
+            pokemon = self.pokemon.to_dict()
         return {
             'id': self.id,
             'pokemon_id': self.pokemon_id,
-            'pokemon': self.pokemon.to_dict() if self.pokemon else None,
+            'pokemon': pokemon,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'notes': self.notes
         }
@@ -210,11 +264,20 @@ class Team(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     name = db.Column(db.String(100), nullable=False, default='My Team')
     description = db.Column(db.Text, nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
+    updated_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now(),
+                           onupdate=db.func.now())
     
     user = db.relationship('User', backref=db.backref('teams', lazy=True))
-    members = db.relationship('TeamMember', backref='team', lazy=True, cascade='all, delete-orphan')
+
+    __table_args__ = (
+        # Serves the teams page: filter by user, most recently updated first
+        db.Index('ix_teams_user_updated', user_id, updated_at.desc()),
+    )
+
+    # Batch-loaded: listing a user's teams fetches all members in one query
+    members = db.relationship('TeamMember', backref='team', lazy='selectin',
+                              cascade='all, delete-orphan')
     
     def to_dict(self):
         return {
@@ -237,8 +300,9 @@ class TeamMember(db.Model):
     slot = db.Column(db.Integer, nullable=False)  # 1-6
     nickname = db.Column(db.String(50), nullable=True)
     
-    pokemon = db.relationship('Pokemon')
-    
+    # Always needed when rendering a member, so join it in up front
+    pokemon = db.relationship('Pokemon', lazy='joined')
+
     __table_args__ = (
         db.UniqueConstraint('team_id', 'slot', name='unique_team_slot'),
         db.CheckConstraint('slot >= 1 AND slot <= 6', name='valid_slot')
@@ -262,9 +326,20 @@ class QuizScore(db.Model):
     score = db.Column(db.Integer, nullable=False)
     total_questions = db.Column(db.Integer, nullable=False, default=10)
     quiz_type = db.Column(db.String(50), default='whos_that_pokemon')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    
-    user = db.relationship('User', backref=db.backref('quiz_scores', lazy=True))
+    created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
+    # Stored generated column so averages/ordering skip per-row arithmetic
+    percent_score = db.Column(
+        db.Float,
+        db.Computed('score * 100.0 / NULLIF(total_questions, 0)', persisted=True)
+    )
+
+    # Joined so leaderboard rows don't lazy-load one user each
+    user = db.relationship('User', backref=db.backref('quiz_scores', lazy=True), lazy='joined')
+
+    __table_args__ = (
+        # Matches the leaderboard's ORDER BY percent_score DESC, created_at DESC
+        db.Index('ix_quiz_percent', percent_score.desc(), created_at.desc()),
+    )
     
     def to_dict(self):
         return {
@@ -272,7 +347,7 @@ class QuizScore(db.Model):
             'user_name': self.user.name if self.user else 'Anonymous',
             'score': self.score,
             'total_questions': self.total_questions,
-            'percentage': round((self.score / self.total_questions) * 100, 1),
+            'percentage': round(self.percent_score, 1) if self.percent_score is not None else 0.0,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
@@ -299,26 +374,30 @@ class PokemonType(db.Model):
     color = db.Column(db.String(7), nullable=False)  # Hex color
     icon = db.Column(db.String(50))  # Font Awesome icon class
     
+    # Built once at import; get_type_data() hands out the shared instance so
+    # every page render reuses the same dict instead of rebuilding it
+    _TYPE_DATA = {
+        'normal': {'color': '#A8A878', 'icon': 'fa-circle'},
+        'fire': {'color': '#F08030', 'icon': 'fa-fire'},
+        'water': {'color': '#6890F0', 'icon': 'fa-droplet'},
+        'electric': {'color': '#F8D030', 'icon': 'fa-bolt'},
+        'grass': {'color': '#78C850', 'icon': 'fa-leaf'},
+        'ice': {'color': '#98D8D8', 'icon': 'fa-snowflake'},
+        'fighting': {'color': '#C03028', 'icon': 'fa-hand-fist'},
+        'poison': {'color': '#A040A0', 'icon': 'fa-skull-crossbones'},
+        'ground': {'color': '#E0C068', 'icon': 'fa-mountain'},
+        'flying': {'color': '#A890F0', 'icon': 'fa-feather'},
+        'psychic': {'color': '#F85888', 'icon': 'fa-brain'},
+        'bug': {'color': '#A8B820', 'icon': 'fa-bug'},
+        'rock': {'color': '#B8A038', 'icon': 'fa-gem'},
+        'ghost': {'color': '#705898', 'icon': 'fa-ghost'},
+        'dragon': {'color': '#7038F8', 'icon': 'fa-dragon'},
+        'dark': {'color': '#705848', 'icon': 'fa-moon'},
+        'steel': {'color': '#B8B8D0', 'icon': 'fa-shield'},
+        'fairy': {'color': '#EE99AC', 'icon': 'fa-star'}
+    }
+
     @staticmethod
     def get_type_data():
         """Return type data with colors"""
-        return {
-            'normal': {'color': '#A8A878', 'icon': 'fa-circle'},
-            'fire': {'color': '#F08030', 'icon': 'fa-fire'},
-            'water': {'color': '#6890F0', 'icon': 'fa-droplet'},
-            'electric': {'color': '#F8D030', 'icon': 'fa-bolt'},
-            'grass': {'color': '#78C850', 'icon': 'fa-leaf'},
-            'ice': {'color': '#98D8D8', 'icon': 'fa-snowflake'},
-            'fighting': {'color': '#C03028', 'icon': 'fa-hand-fist'},
-            'poison': {'color': '#A040A0', 'icon': 'fa-skull-crossbones'},
-            'ground': {'color': '#E0C068', 'icon': 'fa-mountain'},
-            'flying': {'color': '#A890F0', 'icon': 'fa-feather'},
-            'psychic': {'color': '#F85888', 'icon': 'fa-brain'},
-            'bug': {'color': '#A8B820', 'icon': 'fa-bug'},
-            'rock': {'color': '#B8A038', 'icon': 'fa-gem'},
-            'ghost': {'color': '#705898', 'icon': 'fa-ghost'},
-            'dragon': {'color': '#7038F8', 'icon': 'fa-dragon'},
-            'dark': {'color': '#705848', 'icon': 'fa-moon'},
-            'steel': {'color': '#B8B8D0', 'icon': 'fa-shield'},
-            'fairy': {'color': '#EE99AC', 'icon': 'fa-star'}
-        }
+        return PokemonType._TYPE_DATA